@@ -0,0 +1,227 @@
+"""
+Streaming HRV Feature Engine
+Windowed time-domain (RMSSD, SDNN, pNN50), frequency-domain (LF/HF via
+Lomb-Scargle on unevenly spaced RR) and nonlinear (Poincaré SD1/SD2)
+features over RR-interval streams.
+
+Two entry points share the same definitions:
+- compute_window_features(): every window of a long recording in one
+  vectorized pass (prefix sums for time-domain/Poincaré metrics,
+  batched Lomb-Scargle for spectral power).
+- StreamingHRV: O(1) per-beat updates for live readings.
+"""
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+# Standard short-term HRV spectral bands (Hz)
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+PNN50_THRESHOLD_MS = 50.0
+N_FREQUENCIES = 128
+
+FEATURE_NAMES = ['rmssd', 'sdnn', 'pnn50', 'sd1', 'sd2', 'lf_power', 'hf_power', 'lf_hf_ratio']
+
+
+def rmssd(rr_intervals) -> float:
+    """
+    Root Mean Square of Successive Differences over a whole RR array (ms).
+    Formula: sqrt(mean(diff(RR)^2))
+    """
+    diffs = np.diff(np.asarray(rr_intervals, dtype=np.float64))
+    return float(np.sqrt(np.mean(diffs ** 2)))
+
+
+def _window_sums(values: np.ndarray, width: int, starts: np.ndarray) -> np.ndarray:
+    """Sum of values[s:s+width] for every start s, via one prefix sum."""
+    prefix = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    return prefix[starts + width] - prefix[starts]
+
+
+def _sample_variance(total, total_sq, n):
+    return np.maximum(total_sq - total * total / n, 0.0) / (n - 1)
+
+
+def _poincare(diff_var, rr_var):
+    # SD1 = sqrt(var(ΔRR) / 2), SD2 = sqrt(2·var(RR) − var(ΔRR) / 2)
+    sd1 = np.sqrt(0.5 * diff_var)
+    sd2 = np.sqrt(np.maximum(2.0 * rr_var - 0.5 * diff_var, 0.0))
+    return sd1, sd2
+
+
+def _trapezoid(y: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Trapezoidal integral of each row of y over x (NumPy 1.x/2.x safe)."""
+    return ((y[:, 1:] + y[:, :-1]) * np.diff(x) / 2.0).sum(axis=1)
+
+
+def lomb_scargle_band_power(rr_windows: np.ndarray, n_frequencies: int = N_FREQUENCIES,
+                            chunk_windows: int = 64) -> Dict[str, np.ndarray]:
+    """
+    LF and HF power for a batch of RR windows.
+
+    RR samples are placed at their (uneven) beat times, so no resampling
+    or interpolation is needed. Windows are processed in chunks to bound
+    the (windows × beats × frequencies) working set.
+
+    Args:
+        rr_windows: (n_windows, window_beats) RR intervals in ms
+        n_frequencies: Frequency grid size spanning LF_BAND[0]..HF_BAND[1]
+
+    Returns:
+        Dict with 'lf_power', 'hf_power' (ms²) and 'lf_hf_ratio' arrays
+    """
+    rr_windows = np.atleast_2d(np.asarray(rr_windows, dtype=np.float64))
+    freqs = np.linspace(LF_BAND[0], HF_BAND[1], n_frequencies)
+    omega = 2 * np.pi * freqs
+    lf_mask = freqs < LF_BAND[1]
+    hf_mask = ~lf_mask
+
+    lf = np.empty(len(rr_windows))
+    hf = np.empty(len(rr_windows))
+    for start in range(0, len(rr_windows), chunk_windows):
+        rr = rr_windows[start:start + chunk_windows]
+        t = np.cumsum(rr, axis=1) / 1000.0                      # beat times (s)
+        y = rr - rr.mean(axis=1, keepdims=True)
+
+        wt = t[:, :, None] * omega                              # (w, beats, f)
+        tau = np.arctan2(np.sin(2 * wt).sum(axis=1), np.cos(2 * wt).sum(axis=1)) / (2 * omega)
+        phase = wt - (tau * omega)[:, None, :]
+        cos_p, sin_p = np.cos(phase), np.sin(phase)
+        yc = np.einsum('wb,wbf->wf', y, cos_p)
+        ys = np.einsum('wb,wbf->wf', y, sin_p)
+        power = 0.5 * (yc ** 2 / np.maximum((cos_p ** 2).sum(axis=1), 1e-12)
+                       + ys ** 2 / np.maximum((sin_p ** 2).sum(axis=1), 1e-12))
+        # Scale periodogram to a one-sided PSD (ms²/Hz): PSD = P · 2T / N
+        duration = np.maximum(t[:, -1:] - t[:, :1], 1e-12)
+        psd = power * 2.0 * duration / rr.shape[1]
+        lf[start:start + len(rr)] = _trapezoid(psd[:, lf_mask], freqs[lf_mask])
+        hf[start:start + len(rr)] = _trapezoid(psd[:, hf_mask], freqs[hf_mask])
+
+    ratio = np.divide(lf, hf, out=np.full_like(lf, np.nan), where=hf > 0)
+    return {'lf_power': lf, 'hf_power': hf, 'lf_hf_ratio': ratio}
+
+
+def compute_window_features(rr_intervals, window_beats: int = 300, step_beats: int = 30,
+                            spectral: bool = True) -> Dict[str, np.ndarray]:
+    """
+    All HRV features for every sliding window of an RR recording.
+
+    Args:
+        rr_intervals: 1-D RR intervals in ms (hours of beats is fine)
+        window_beats: Beats per window (300 ≈ 5 minutes at rest)
+        step_beats: Beats between consecutive window starts
+        spectral: Also compute LF/HF power (the costliest part)
+
+    Returns:
+        Dict of equal-length arrays: 'start_beat', 'end_time_s' and FEATURE_NAMES
+    """
+    rr = np.asarray(rr_intervals, dtype=np.float64)
+    if len(rr) < window_beats:
+        raise ValueError(f"Need at least {window_beats} RR intervals, got {len(rr)}")
+    starts = np.arange(0, len(rr) - window_beats + 1, step_beats)
+
+    diffs = np.diff(rr)
+    n_diffs = window_beats - 1
+    rr_sum = _window_sums(rr, window_beats, starts)
+    rr_sq = _window_sums(rr * rr, window_beats, starts)
+    d_sum = _window_sums(diffs, n_diffs, starts)
+    d_sq = _window_sums(diffs * diffs, n_diffs, starts)
+    nn50 = _window_sums((np.abs(diffs) > PNN50_THRESHOLD_MS).astype(np.float64), n_diffs, starts)
+
+    rr_var = _sample_variance(rr_sum, rr_sq, window_beats)
+    diff_var = _sample_variance(d_sum, d_sq, n_diffs)
+    sd1, sd2 = _poincare(diff_var, rr_var)
+
+    features = {
+        'start_beat': starts,
+        'end_time_s': np.cumsum(rr)[starts + window_beats - 1] / 1000.0,
+        'rmssd': np.sqrt(d_sq / n_diffs),
+        'sdnn': np.sqrt(rr_var),
+        'pnn50': 100.0 * nn50 / n_diffs,
+        'sd1': sd1,
+        'sd2': sd2,
+    }
+    if spectral:
+        windows = np.lib.stride_tricks.sliding_window_view(rr, window_beats)[starts]
+        features.update(lomb_scargle_band_power(windows))
+    else:
+        for name in ('lf_power', 'hf_power', 'lf_hf_ratio'):
+            features[name] = np.full(len(starts), np.nan)
+    return features
+
+
+class StreamingHRV:
+    """
+    Rolling HRV features over the last `window_beats` RR intervals.
+
+    Running sums are updated in O(1) per beat, so time-domain and
+    Poincaré features are always current. Spectral power needs the whole
+    window and is computed lazily on request, then cached until the next beat.
+    """
+
+    def __init__(self, window_beats: int = 300):
+        self.window_beats = window_beats
+        self.rr = deque(maxlen=window_beats)
+        self.diffs = deque(maxlen=window_beats - 1)
+        self._rr_sum = self._rr_sq = 0.0
+        self._d_sum = self._d_sq = 0.0
+        self._nn50 = 0
+        self._spectral_cache: Optional[Dict[str, float]] = None
+
+    def update(self, rr_ms: float) -> Dict[str, float]:
+        """Add one RR interval (ms) and return the current time-domain features."""
+        rr_ms = float(rr_ms)
+        if self.rr:
+            diff = rr_ms - self.rr[-1]
+            if len(self.diffs) == self.diffs.maxlen:
+                old = self.diffs[0]
+                self._d_sum -= old
+                self._d_sq -= old * old
+                self._nn50 -= abs(old) > PNN50_THRESHOLD_MS
+            self.diffs.append(diff)
+            self._d_sum += diff
+            self._d_sq += diff * diff
+            self._nn50 += abs(diff) > PNN50_THRESHOLD_MS
+
+        if len(self.rr) == self.rr.maxlen:
+            old = self.rr[0]
+            self._rr_sum -= old
+            self._rr_sq -= old * old
+        self.rr.append(rr_ms)
+        self._rr_sum += rr_ms
+        self._rr_sq += rr_ms * rr_ms
+
+        self._spectral_cache = None
+        return self.features(spectral=False)
+
+    def features(self, spectral: bool = False) -> Dict[str, float]:
+        """
+        Current window features (NaN until at least 3 beats are buffered).
+
+        Args:
+            spectral: Include LF/HF power (O(window) Lomb-Scargle, cached)
+        """
+        n, m = len(self.rr), len(self.diffs)
+        if n < 3:
+            return {name: float('nan') for name in FEATURE_NAMES}
+
+        rr_var = float(_sample_variance(self._rr_sum, self._rr_sq, n))
+        diff_var = float(_sample_variance(self._d_sum, self._d_sq, m))
+        sd1, sd2 = _poincare(diff_var, rr_var)
+        result = {
+            'rmssd': float(np.sqrt(max(self._d_sq, 0.0) / m)),
+            'sdnn': float(np.sqrt(rr_var)),
+            'pnn50': 100.0 * self._nn50 / m,
+            'sd1': float(sd1),
+            'sd2': float(sd2),
+            'lf_power': float('nan'),
+            'hf_power': float('nan'),
+            'lf_hf_ratio': float('nan'),
+        }
+        if spectral:
+            if self._spectral_cache is None:
+                bands = lomb_scargle_band_power(np.asarray(self.rr)[None, :])
+                self._spectral_cache = {k: float(v[0]) for k, v in bands.items()}
+            result.update(self._spectral_cache)
+        return result
@@ -3,7 +3,8 @@ Machine Learning Models for Resilience Forecasting.
 Implements time-series prediction models.
 """
 import numpy as np
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 
 class PredictiveModels:
     """
@@ -12,28 +13,29 @@ class PredictiveModels:
     """
     
     @staticmethod
-    def forecast_sri(history: List[float], horizon_hours: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+    def forecast_sri(history: List[float], horizon_hours: int = 4) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
         Predicts future SRI values and confidence intervals.
-        """
-        if len(history) < 5:
-            history = [65.0, 68.0, 64.0, 70.0, 72.0]
-            
-        # Mocking a learned trend using a polynomial fit + noise
-        x = np.arange(len(history))
-        poly = np.polyfit(x, history, 1)
-        
-        future_x = np.arange(len(history), len(history) + horizon_hours)
-        prediction = np.polyval(poly, future_x)
         
-        # Add some seasonality (simulating circadian rhythm influence)
-        prediction += 5 * np.sin(future_x / 2.0)
+        Stateless wrapper: filters the history through a fresh
+        OnlineSRIForecaster. Keep a forecaster per user to avoid
+        re-reading the history on every call.
         
-        # Confidence intervals
-        upper = prediction + 5.0
-        lower = prediction - 5.0
+        Returns:
+            (prediction, upper, lower) arrays of length horizon_hours
+        """
+        if len(history) < MIN_SRI_HISTORY:
+            history = DEFAULT_SRI_HISTORY
         
-        return prediction, upper, lower
+        forecaster = OnlineSRIForecaster()
+        forecaster.update_many(history)
+        return forecaster.forecast(horizon_hours)
+
+    @staticmethod
+    def forecast_cohort(histories: Sequence[Sequence[float]], horizon_hours: int = 4,
+                        **kwargs) -> Dict[str, np.ndarray]:
+        """Batch SRI forecast for many users; see forecast_cohort()."""
+        return forecast_cohort(histories, horizon_hours, **kwargs)
 
     @staticmethod
     def calculate_risk_probability(current_sri: float, trend: float) -> float:
@@ -42,3 +44,232 @@ class PredictiveModels:
         if trend < 0:
             base_prob += abs(trend) * 0.1
         return min(0.95, max(0.05, base_prob))
+
+
+class OnlineSRIForecaster:
+    """
+    Kalman-filter forecaster: local linear trend + circadian harmonics.
+    
+    State = [level, slope, (cos_k, sin_k) per harmonic of a 24-step day].
+    Each new hourly SRI sample costs one fixed-size predict/update step,
+    independent of how much history has been seen. Observation noise is
+    re-estimated from the innovations, so prediction intervals widen for
+    noisy users and tighten for stable ones.
+    """
+    
+    def __init__(self, period: int = 24, harmonics: int = 1, level_var: float = 0.5,
+                 slope_var: float = 0.005, seasonal_var: float = 0.05, obs_var: float = 16.0,
+                 obs_var_rate: float = 0.05):
+        self.period = period
+        self.harmonics = harmonics
+        self.level_var = level_var
+        self.slope_var = slope_var
+        self.seasonal_var = seasonal_var
+        self.obs_var = obs_var
+        self.obs_var_rate = obs_var_rate
+        self.n_obs = 0
+        
+        dim = 2 + 2 * harmonics
+        self.x = np.zeros(dim)
+        self.P = np.eye(dim) * 1e3  # Diffuse prior until data arrives
+        self._build_matrices()
+    
+    def _build_matrices(self):
+        dim = 2 + 2 * self.harmonics
+        F = np.zeros((dim, dim))
+        F[0, 0] = F[0, 1] = F[1, 1] = 1.0
+        for k in range(1, self.harmonics + 1):
+            angle = 2 * np.pi * k / self.period
+            i = 2 * k
+            F[i:i + 2, i:i + 2] = [[np.cos(angle), np.sin(angle)], [-np.sin(angle), np.cos(angle)]]
+        self.F = F
+        self.H = np.zeros(dim)
+        self.H[0] = 1.0
+        self.H[2::2] = 1.0
+        self.Q = np.diag([self.level_var, self.slope_var] + [self.seasonal_var] * (2 * self.harmonics))
+    
+    def update(self, sri: float):
+        """Assimilate one SRI sample (O(1) for a fixed number of harmonics)."""
+        if self.n_obs == 0:
+            self.x[0] = sri
+            self.P[0, 0] = self.obs_var
+        else:
+            self.x = self.F @ self.x
+            self.P = self.F @ self.P @ self.F.T + self.Q
+        
+        innovation = sri - self.H @ self.x
+        PHt = self.P @ self.H
+        S = self.H @ PHt + self.obs_var
+        gain = PHt / S
+        self.x = self.x + gain * innovation
+        self.P = self.P - np.outer(gain, PHt)
+        
+        if self.n_obs > 0:
+            # Innovation-based estimate of measurement noise (floored)
+            implied = innovation ** 2 - (S - self.obs_var)
+            self.obs_var = max(1.0, (1 - self.obs_var_rate) * self.obs_var + self.obs_var_rate * implied)
+        self.n_obs += 1
+    
+    def update_many(self, values):
+        """Assimilate a sequence of samples in order."""
+        for value in values:
+            self.update(float(value))
+    
+    def forecast(self, horizon: int = 4, z: float = 1.96) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Forecast the next `horizon` samples from the current state.
+        
+        Args:
+            z: Normal quantile of the interval (1.96 = 95%)
+        
+        Returns:
+            (prediction, upper, lower) arrays
+        """
+        x, P = self.x.copy(), self.P.copy()
+        mean = np.empty(horizon)
+        var = np.empty(horizon)
+        for h in range(horizon):
+            x = self.F @ x
+            P = self.F @ P @ self.F.T + self.Q
+            mean[h] = self.H @ x
+            var[h] = self.H @ P @ self.H + self.obs_var
+        half_width = z * np.sqrt(var)
+        return mean, mean + half_width, mean - half_width
+    
+    def to_dict(self) -> Dict:
+        """JSON-serializable state, for persisting per-user forecasters."""
+        return {
+            'period': self.period,
+            'harmonics': self.harmonics,
+            'level_var': self.level_var,
+            'slope_var': self.slope_var,
+            'seasonal_var': self.seasonal_var,
+            'obs_var': self.obs_var,
+            'obs_var_rate': self.obs_var_rate,
+            'n_obs': self.n_obs,
+            'x': self.x.tolist(),
+            'P': self.P.tolist()
+        }
+    
+    @classmethod
+    def from_dict(cls, state: Dict) -> "OnlineSRIForecaster":
+        """Restore a forecaster saved with to_dict()."""
+        forecaster = cls(
+            period=state['period'], harmonics=state['harmonics'], level_var=state['level_var'],
+            slope_var=state['slope_var'], seasonal_var=state['seasonal_var'],
+            obs_var=state['obs_var'], obs_var_rate=state['obs_var_rate']
+        )
+        forecaster.n_obs = state['n_obs']
+        forecaster.x = np.asarray(state['x'], dtype=np.float64)
+        forecaster.P = np.asarray(state['P'], dtype=np.float64)
+        return forecaster
+
+
+# --- Cohort-scale batch forecasting ---
+
+COHORT_MAX_HISTORY = 24 * 28  # Most recent samples used per user (4 weeks hourly)
+COHORT_PRIOR_VAR = 16.0  # SRI noise variance assumed for users with very short histories
+# Histories shorter than MIN_SRI_HISTORY are forecast from a typical default history
+MIN_SRI_HISTORY = 5
+DEFAULT_SRI_HISTORY = [65.0, 68.0, 64.0, 70.0, 72.0]
+
+
+def pad_histories(histories: Sequence[Sequence[float]], max_history: int = COHORT_MAX_HISTORY
+                  ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Right-align ragged histories into a padded matrix plus validity mask.
+    The last sample of every user lands in the last column, so all users
+    share one time grid ending "now".
+    
+    Returns:
+        (values, mask) arrays of shape (n_users, T); padded cells are 0/False
+    """
+    lengths = np.array([min(len(h), max_history) for h in histories], dtype=np.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    values = np.zeros((len(histories), width))
+    mask = np.arange(width) >= (width - lengths)[:, None]
+    flat = [np.asarray(h, dtype=np.float64)[len(h) - n:] for h, n in zip(histories, lengths)]
+    if flat:
+        values[mask] = np.concatenate(flat)
+    return values, mask
+
+
+def _cohort_design(times: np.ndarray, period: int) -> np.ndarray:
+    """Columns: level, trend, circadian cos/sin."""
+    angle = 2 * np.pi * times / period
+    return np.column_stack([np.ones_like(times), times, np.cos(angle), np.sin(angle)])
+
+
+def _forecast_chunk(values: np.ndarray, mask: np.ndarray, horizon: int, period: int,
+                    ridge: float, z: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Masked ridge regression fit + forecast for one chunk of users."""
+    width = values.shape[1]
+    X = _cohort_design(np.arange(-width + 1, 1, dtype=np.float64), period)
+    X_future = _cohort_design(np.arange(1, horizon + 1, dtype=np.float64), period)
+    weights = mask.astype(np.float64)
+    
+    # Per-user normal equations; the level term is left unpenalized
+    A = np.einsum('ut,tp,tq->upq', weights, X, X)
+    A += np.diag([0.0, ridge, ridge, ridge])
+    b = (weights * values) @ X
+    # Users with no samples get an identity system (zero coefficients)
+    empty = weights.sum(axis=1) == 0
+    A[empty] = np.eye(X.shape[1])
+    A_inv = np.linalg.inv(A)
+    coef = np.einsum('upq,uq->up', A_inv, b)
+    
+    residuals = (values - coef @ X.T) * weights
+    n_obs = weights.sum(axis=1)
+    sigma2 = (residuals ** 2).sum(axis=1) / np.maximum(n_obs - X.shape[1], 1.0)
+    # Too few samples to estimate noise: fall back to the prior variance
+    sigma2 = np.where(n_obs > X.shape[1], sigma2, COHORT_PRIOR_VAR)
+    
+    prediction = coef @ X_future.T
+    leverage = np.einsum('hp,upq,hq->uh', X_future, A_inv, X_future)
+    half_width = z * np.sqrt(sigma2[:, None] * (1.0 + leverage))
+    return prediction, prediction + half_width, prediction - half_width
+
+
+def _forecast_histories(chunk, settings):
+    """Process-pool work unit: pad one chunk of histories, then fit and forecast it."""
+    horizon, period, max_history, ridge, z = settings
+    values, mask = pad_histories(chunk, max_history)
+    return _forecast_chunk(values, mask, horizon, period, ridge, z)
+
+
+def forecast_cohort(histories: Sequence[Sequence[float]], horizon_hours: int = 4, period: int = 24,
+                    chunk_users: int = 20000, max_workers: Optional[int] = None,
+                    max_history: int = COHORT_MAX_HISTORY, ridge: float = 1.0,
+                    z: float = 1.96) -> Dict[str, np.ndarray]:
+    """
+    Fit and forecast SRI for many users at once.
+    
+    Each user gets a trend + circadian regression solved with batched
+    normal equations over the padded, masked history matrix. Chunks of
+    users run in a process pool when there is more than one chunk.
+    
+    Args:
+        histories: Ragged list of hourly SRI histories (oldest first); users
+            with fewer than MIN_SRI_HISTORY samples get the forecast_sri
+            default history
+        chunk_users: Users per work unit (bounds per-process memory)
+        max_workers: Process pool size (None = CPU count); 0 runs in-process
+    
+    Returns:
+        Dict with 'prediction', 'upper', 'lower' arrays of shape (n_users, horizon)
+    """
+    histories = [h if len(h) >= MIN_SRI_HISTORY else DEFAULT_SRI_HISTORY for h in histories]
+    chunks = [histories[i:i + chunk_users] for i in range(0, len(histories), chunk_users)]
+    settings = (horizon_hours, period, max_history, ridge, z)
+    
+    if len(chunks) > 1 and max_workers != 0:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_forecast_histories, chunks, [settings] * len(chunks)))
+    else:
+        results = [_forecast_histories(chunk, settings) for chunk in chunks]
+    
+    if not results:
+        empty = np.empty((0, horizon_hours))
+        return {'prediction': empty, 'upper': empty.copy(), 'lower': empty.copy()}
+    prediction, upper, lower = (np.concatenate(parts) for parts in zip(*results))
+    return {'prediction': prediction, 'upper': upper, 'lower': lower}
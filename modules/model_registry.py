@@ -0,0 +1,215 @@
+"""
+Process-wide registry for trained ML models.
+Loads each model once per process, verifies it against its metadata
+sidecar (content hash + version) and retrains missing or stale models
+on a background thread instead of in the request path.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+def _sidecar_path(path: str) -> str:
+    return path + ".meta.json"
+
+
+def save_model_file(path: str, model: Any, version: int) -> str:
+    """
+    Atomically write a pickled model plus its metadata sidecar.
+
+    Args:
+        path: Destination pickle path
+        model: Trained model object
+        version: Model schema version stored alongside the hash
+
+    Returns:
+        SHA-256 hex digest of the written pickle
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    payload = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    digest = hashlib.sha256(payload).hexdigest()
+
+    meta = {"sha256": digest, "version": version, "saved_at": time.time()}
+    for target, data in ((path, payload), (_sidecar_path(path), json.dumps(meta).encode())):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_model_")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates 0600 files; workers running as other users must read them
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    return digest
+
+
+class ModelRegistry:
+    """
+    Lazy, thread-safe cache of trained models keyed by name.
+
+    A registered model is unpickled on first use only. If the file is
+    missing, fails its hash check or carries an older version, get()
+    returns None and the trainer runs once on a daemon thread; callers
+    fall back to a heuristic until the fresh model is cached. A failed
+    retrain is not retried until invalidate() is called.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, path: str, trainer: Callable[[], Any], version: int = 1):
+        """
+        Register a model source.
+
+        Args:
+            name: Registry key
+            path: Pickle path written by save_model_file()
+            trainer: Zero-argument callable that trains and saves the model
+            version: Expected model version; older files are retrained
+        """
+        with self._lock:
+            self._entries[name] = {
+                "path": path,
+                "trainer": trainer,
+                "version": version,
+                "model": None,
+                "sha256": None,
+                "training": None,
+                "load_seconds": None,
+                "train_seconds": None,
+                "inference_count": 0,
+                "inference_seconds": 0.0,
+                "last_inference_seconds": None,
+                "error": None,
+            }
+
+    def get(self, name: str, wait: bool = False) -> Optional[Any]:
+        """
+        Return the cached model, loading it on first access.
+
+        Args:
+            name: Registry key
+            wait: Block until a background retrain finishes instead of
+                returning None while it runs
+
+        Returns:
+            Model object, or None while it is being (re)trained
+        """
+        entry = self._entries[name]
+        model = entry["model"]
+        if model is not None:
+            return model
+
+        with self._lock:
+            idle = entry["training"] is None and entry["error"] is None
+            if entry["model"] is None and idle:
+                if not self._load(entry):
+                    self._start_training(name, entry)
+            thread = entry["training"]
+
+        if wait and thread is not None:
+            thread.join()
+        return entry["model"]
+
+    def _load(self, entry: Dict) -> bool:
+        path = entry["path"]
+        sidecar = _sidecar_path(path)
+        if not (os.path.exists(path) and os.path.exists(sidecar)):
+            return False
+
+        start = time.perf_counter()
+        with open(sidecar, "r") as f:
+            meta = json.load(f)
+        with open(path, "rb") as f:
+            payload = f.read()
+        digest = hashlib.sha256(payload).hexdigest()
+        if digest != meta.get("sha256") or meta.get("version") != entry["version"]:
+            return False
+
+        entry["model"] = pickle.loads(payload)
+        entry["sha256"] = digest
+        entry["load_seconds"] = time.perf_counter() - start
+        return True
+
+    def _start_training(self, name: str, entry: Dict):
+        def run():
+            start = time.perf_counter()
+            try:
+                entry["trainer"]()
+                with self._lock:
+                    entry["model"] = None
+                    if not self._load(entry):
+                        # Recorded as a training error so get() keeps the
+                        # fallback instead of retraining on every call
+                        raise RuntimeError(f"trained model at {entry['path']} failed to load")
+                entry["train_seconds"] = time.perf_counter() - start
+                entry["error"] = None
+            except Exception as exc:
+                entry["error"] = repr(exc)
+            finally:
+                with self._lock:
+                    entry["training"] = None
+
+        thread = threading.Thread(target=run, name=f"train-{name}", daemon=True)
+        entry["training"] = thread
+        thread.start()
+
+    def publish(self, name: str, model: Any) -> str:
+        """
+        Save a freshly trained model and swap it into the cache.
+        The file is replaced atomically, so readers see either the old
+        or the new model, never a partial write.
+
+        Returns:
+            SHA-256 of the published pickle
+        """
+        entry = self._entries[name]
+        digest = save_model_file(entry["path"], model, entry["version"])
+        with self._lock:
+            entry["model"] = model
+            entry["sha256"] = digest
+            entry["error"] = None
+        return digest
+
+    def invalidate(self, name: str):
+        """Drop the cached model (and any training error) so the next get() reloads it."""
+        with self._lock:
+            self._entries[name]["model"] = None
+            self._entries[name]["error"] = None
+
+    def record_inference(self, name: str, seconds: float):
+        """Accumulate inference timing for a model."""
+        entry = self._entries[name]
+        entry["inference_count"] += 1
+        entry["inference_seconds"] += seconds
+        entry["last_inference_seconds"] = seconds
+
+    def stats(self, name: str) -> Dict:
+        """
+        Load, training and inference timings for a model.
+
+        Returns:
+            Dict with loaded flag, hash, version and timing fields
+        """
+        entry = self._entries[name]
+        count = entry["inference_count"]
+        return {
+            "loaded": entry["model"] is not None,
+            "training": entry["training"] is not None,
+            "sha256": entry["sha256"],
+            "version": entry["version"],
+            "load_seconds": entry["load_seconds"],
+            "train_seconds": entry["train_seconds"],
+            "inference_count": count,
+            "mean_inference_seconds": entry["inference_seconds"] / count if count else None,
+            "last_inference_seconds": entry["last_inference_seconds"],
+            "error": entry["error"],
+        }
+
+
+# Process-wide instance shared by all modules
+MODEL_REGISTRY = ModelRegistry()
@@ -2,8 +2,39 @@
 Advanced Physiological Modeling for the Digital Twin.
 Simulates organ system interactions and recovery kinetics.
 """
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-from typing import Dict, List, Tuple
+from scipy.integrate import solve_ivp
+from typing import Dict, List, Optional, Tuple
+
+# ODE time constants (minutes) and cortisol resting level
+SYMPATHETIC_TAU = 2.0
+VAGAL_TAU = 0.25
+CORTISOL_TAU = 20.0
+CORTISOL_BASELINE = 10.0
+# Expected RQ boost per intervention (counterfactual lookup)
+INTERVENTION_BOOSTS = {
+    'breathwork': 15.0,
+    'nap': 25.0,
+    'hydration': 5.0,
+    'meditation': 12.0
+}
+# Parameters used by the ODE model; cortisol_coupling lets elevated
+# cortisol sustain sympathetic drive (per minute, per cortisol unit)
+DEFAULT_PARAMS = {
+    'vagal_tone': 65.0,
+    'cortisol_sensitivity': 0.4,
+    'sympathetic_reactivity': 0.7,
+    'metabolic_rate': 1.0,
+    'hydration': 0.9,
+    'cortisol_coupling': 0.02
+}
 
 class AdvancedPhysiologyModel:
     """
@@ -21,30 +52,86 @@ class AdvancedPhysiologyModel:
             'hydration': 0.9
         }
         
-    def simulate_stress_response(self, stressor_magnitude: float, duration_min: int) -> Dict:
+    def simulate_stress_response(self, stressor_magnitude: float, duration_min: int,
+                                 times: np.ndarray = None) -> Dict:
         """
         Simulates how the body responds to a specific stressor.
         Returns time-series data for HRV, Core Temp, and Cortisol.
+        
+        Solved with the coupled ODE model (see simulate_population) and
+        sampled at `times` (minutes); defaults to one point per second.
         """
-        steps = duration_min * 60 # per second
-        time = np.linspace(0, duration_min, steps)
+        if times is None:
+            steps = duration_min * 60 # per second
+            times = np.linspace(0, duration_min, steps)
+        times = np.asarray(times, dtype=np.float64)
+        if len(times) == 0 or duration_min <= 0:
+            # No time span to integrate over
+            return {'time': times[:0], 'hrv': np.empty(0), 'cortisol': np.empty(0)}
         
-        # 1. HRV Response (Immediate Drop, Exponential Recovery)
-        # Drop = stressor * sympathetic_reactivity
-        drop = stressor_magnitude * self.params['sympathetic_reactivity'] * 30
-        hrv = self.params['vagal_tone'] - drop * np.exp(-time/2.0) + np.random.normal(0, 1, steps)
+        solution = self.simulate_population(stressor_magnitude, duration_min)
+        states = solution(times)
+        hrv = states['hrv'][0] + np.random.normal(0, 1, len(times))
         hrv = np.clip(hrv, 20, 100)
         
-        # 2. Cortisol (Delayed Peak)
-        # Cortisol peaks ~20 mins after stressor
-        cortisol = 10 + (stressor_magnitude * 20) * (time/20.0) * np.exp(1 - time/20.0)
-        
         return {
-            'time': time,
+            'time': times,
             'hrv': hrv,
-            'cortisol': cortisol
+            'cortisol': states['cortisol'][0]
         }
 
+    def simulate_population(self, stressor_magnitude, duration_min: float, params_batch=None,
+                            rtol: float = 1e-6, atol: float = 1e-6) -> "PhysiologySolution":
+        """
+        Solves the coupled stress-response ODEs for a batch of parameter sets.
+        
+        States per member (t in minutes):
+            S  sympathetic drive      dS/dt = -S·m/τ_s + coupling·(C - C_base)
+            V  vagal tone (HRV)       dV/dt = h·(vagal_tone - S - V)/τ_v
+            D  HPA-axis drive         dD/dt = -D/τ_c
+            C  cortisol               dC/dt = (D - (C - C_base))/τ_c
+        with m = metabolic_rate and h = hydration. The stressor sets the initial
+        sympathetic surge (magnitude·reactivity·30) and HPA drive. Without
+        coupling and with fast vagal dynamics this reduces to the original
+        closed-form curves: exponential HRV recovery (τ=2 min) and a cortisol
+        peak at ~20 min.
+        
+        All members are integrated together with adaptive RK45 steps.
+        
+        Args:
+            stressor_magnitude: Scalar or one value per member
+            params_batch: Dict of parameter arrays, or a list of parameter
+                dicts (missing keys fall back to self.params); None = self.params
+        
+        Returns:
+            PhysiologySolution, callable at arbitrary times (dense output)
+        """
+        params = stack_params(params_batch, defaults=self.params)
+        n = len(params['vagal_tone'])
+        magnitude = np.broadcast_to(np.asarray(stressor_magnitude, dtype=np.float64), (n,))
+        
+        surge = magnitude * params['sympathetic_reactivity'] * 30
+        y0 = np.concatenate([
+            surge,                                           # S
+            params['vagal_tone'] - surge,                    # V
+            magnitude * 20 * np.e * params['cortisol_sensitivity'] / 0.4,  # D
+            np.full(n, CORTISOL_BASELINE)                    # C
+        ])
+        
+        def rhs(t, y):
+            S, V, D, C = y.reshape(4, n)
+            dS = -S * params['metabolic_rate'] / SYMPATHETIC_TAU + params['cortisol_coupling'] * (C - CORTISOL_BASELINE)
+            dV = params['hydration'] * (params['vagal_tone'] - S - V) / VAGAL_TAU
+            dD = -D / CORTISOL_TAU
+            dC = (D - (C - CORTISOL_BASELINE)) / CORTISOL_TAU
+            return np.concatenate([dS, dV, dD, dC])
+        
+        result = solve_ivp(rhs, (0.0, float(duration_min)), y0, method='RK45',
+                           dense_output=True, rtol=rtol, atol=atol)
+        if not result.success:
+            raise RuntimeError(f"Stress-response ODE failed: {result.message}")
+        return PhysiologySolution(result.sol, n, result.t)
+
     def predict_recovery_kinetics(self, current_state: Dict) -> Dict:
         """
         Predicts t1/2 (half-life) of stress recovery.
@@ -63,10 +150,318 @@ class AdvancedPhysiologyModel:
         """
         Simulates what would happen if an intervention was applied.
         """
-        boosts = {
-            'breathwork': 15.0,
-            'nap': 25.0,
-            'hydration': 5.0,
-            'meditation': 12.0
-        }
-        return min(100, baseline_rq + boosts.get(intervention, 0))
+        return min(100, baseline_rq + INTERVENTION_BOOSTS.get(intervention, 0))
+
+
+def stack_params(params_batch, defaults: Dict = None) -> Dict[str, np.ndarray]:
+    """
+    Normalizes a parameter batch to a dict of equal-length float arrays.
+    Accepts None, one params dict, a list of dicts, or a dict of arrays.
+    """
+    base = {**DEFAULT_PARAMS, **(defaults or {})}
+    if params_batch is None:
+        params_batch = base
+    if isinstance(params_batch, dict):
+        merged = {key: params_batch.get(key, value) for key, value in base.items()}
+        arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in merged.values()))
+        return dict(zip(merged.keys(), arrays))
+    return {
+        key: np.array([p.get(key, value) for p in params_batch], dtype=np.float64)
+        for key, value in base.items()
+    }
+
+
+class PhysiologySolution:
+    """Dense output of a batched ODE solve; call with times in minutes."""
+    
+    STATES = ('sympathetic', 'hrv', 'hpa_drive', 'cortisol')
+    
+    def __init__(self, dense, n_members: int, step_times: np.ndarray):
+        self.dense = dense
+        self.n_members = n_members
+        self.step_times = step_times  # Adaptive step boundaries chosen by the solver
+    
+    def __call__(self, times) -> Dict[str, np.ndarray]:
+        """
+        Returns:
+            Dict of state name -> (n_members, len(times)) arrays
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        values = self.dense(times).reshape(4, self.n_members, len(times))
+        return dict(zip(self.STATES, values))
+
+
+# --- Per-user parameter fitting ---
+
+# Candidate metabolic rates for the HRV recovery grid search
+FIT_RATE_GRID = np.geomspace(0.2, 5.0, 64)
+FIT_BOUNDS = {
+    'vagal_tone': (20.0, 120.0),
+    'sympathetic_reactivity': (0.05, 2.0),
+    'metabolic_rate': (0.2, 5.0),
+    'cortisol_sensitivity': (0.05, 2.0),
+}
+# Cap on (episodes × rates × samples) basis elements evaluated at once (~32 MB of float64)
+FIT_BLOCK_ELEMENTS = 1 << 22
+
+
+def episode_fingerprint(episodes: List[Dict]) -> str:
+    """Stable SHA-256 over a user's episode arrays, used to skip unchanged users."""
+    digest = hashlib.sha256()
+    for episode in episodes:
+        for key in ('time', 'hrv', 'cortisol'):
+            if episode.get(key) is not None:
+                digest.update(key.encode())
+                digest.update(np.ascontiguousarray(episode[key], dtype=np.float64).tobytes())
+        digest.update(repr(float(episode.get('stressor_magnitude', 1.0))).encode())
+    return digest.hexdigest()
+
+
+def _pad(series: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    width = max(len(x) for x in series)
+    values = np.zeros((len(series), width))
+    mask = np.zeros((len(series), width), dtype=bool)
+    for i, x in enumerate(series):
+        values[i, :len(x)] = x
+        mask[i, :len(x)] = True
+    return values, mask
+
+
+def fit_episodes(episodes: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Least-squares parameter estimates for a batch of stress episodes.
+    
+    HRV follows vagal_tone - surge·exp(-k·t) when cortisol coupling is
+    neglected. For every candidate rate k that model is linear in
+    (vagal_tone, surge), so all episodes × rates are solved at once from
+    2×2 normal equations and the rate with the smallest residual wins.
+    Cortisol, when recorded, gives cortisol_sensitivity in closed form.
+    
+    Args:
+        episodes: Dicts with 'time' (minutes since stressor onset), 'hrv',
+            optional 'cortisol' and 'stressor_magnitude' (default 1.0)
+    
+    Returns:
+        Dict of per-episode parameter arrays
+    """
+    t, mask = _pad([np.asarray(e['time'], dtype=np.float64) for e in episodes])
+    y, _ = _pad([np.asarray(e['hrv'], dtype=np.float64) for e in episodes])
+    w = mask.astype(np.float64)
+    magnitude = np.array([float(e.get('stressor_magnitude', 1.0)) for e in episodes])
+    
+    k = FIT_RATE_GRID / SYMPATHETIC_TAU
+    n = w.sum(axis=1)[:, None]
+    sy = (w * y).sum(axis=1)[:, None]
+    syy = (w * y * y).sum(axis=1)[:, None]
+    wy = w * y
+    
+    # Basis sums over (episode, rate) blocks of bounded size rather than
+    # one (E, K, T) array, so peak memory does not grow with the batch
+    n_episodes, width = t.shape
+    rate_step = int(np.clip(FIT_BLOCK_ELEMENTS // max(width, 1), 1, len(k)))
+    episode_step = max(1, FIT_BLOCK_ELEMENTS // (rate_step * max(width, 1)))
+    sb = np.empty((n_episodes, len(k)))
+    sbb = np.empty_like(sb)
+    sby = np.empty_like(sb)
+    for e0 in range(0, n_episodes, episode_step):
+        rows = slice(e0, e0 + episode_step)
+        for k0 in range(0, len(k), rate_step):
+            rates = slice(k0, k0 + rate_step)
+            basis = np.exp(-t[rows, None, :] * k[None, rates, None])   # (e, k, T) block
+            sb[rows, rates] = np.einsum('et,ekt->ek', w[rows], basis)
+            sby[rows, rates] = np.einsum('et,ekt->ek', wy[rows], basis)
+            basis *= basis
+            sbb[rows, rates] = np.einsum('et,ekt->ek', w[rows], basis)
+    
+    det = np.where(np.abs(n * sbb - sb * sb) > 1e-12, n * sbb - sb * sb, np.inf)
+    a = (sbb * sy - sb * sby) / det
+    c = (n * sby - sb * sy) / det
+    sse = syy - a * sy - c * sby
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(len(episodes))
+    
+    vagal_tone = a[rows, best]
+    surge = -c[rows, best]
+    fitted = {
+        'vagal_tone': vagal_tone,
+        'sympathetic_reactivity': surge / (30 * np.maximum(magnitude, 1e-9)),
+        'metabolic_rate': FIT_RATE_GRID[best],
+        'cortisol_sensitivity': np.full(len(episodes), np.nan),
+    }
+    
+    with_cortisol = [i for i, e in enumerate(episodes) if e.get('cortisol') is not None]
+    if with_cortisol:
+        sub = [episodes[i] for i in with_cortisol]
+        tc, cmask = _pad([np.asarray(e['time'], dtype=np.float64) for e in sub])
+        cort, _ = _pad([np.asarray(e['cortisol'], dtype=np.float64) for e in sub])
+        g = magnitude[with_cortisol, None] * 20 * np.e * (tc / CORTISOL_TAU) * np.exp(-tc / CORTISOL_TAU)
+        g *= cmask
+        scale = (g * (cort - CORTISOL_BASELINE)).sum(axis=1) / np.maximum((g * g).sum(axis=1), 1e-12)
+        fitted['cortisol_sensitivity'][with_cortisol] = 0.4 * scale
+    
+    for key, (low, high) in FIT_BOUNDS.items():
+        fitted[key] = np.clip(fitted[key], low, high)
+    return fitted
+
+
+def _fit_users_chunk(chunk: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+    """Process-pool work unit: one batched fit over all episodes of a chunk of users."""
+    user_ids = list(chunk)
+    episodes = [e for uid in user_ids for e in chunk[uid]]
+    owner = np.repeat(np.arange(len(user_ids)), [len(chunk[uid]) for uid in user_ids])
+    fitted = fit_episodes(episodes)
+    
+    results = {}
+    for i, uid in enumerate(user_ids):
+        params = dict(DEFAULT_PARAMS)
+        for key, values in fitted.items():
+            user_values = values[owner == i]
+            user_values = user_values[~np.isnan(user_values)]
+            if len(user_values):
+                params[key] = float(np.median(user_values))
+        results[uid] = params
+    return results
+
+
+class ParameterFitCache:
+    """
+    JSON store of fitted parameters keyed by user, with the fingerprint of
+    the episode data they were fitted from.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+    
+    def get(self, user_id: str, fingerprint: str) -> Optional[Dict]:
+        entry = self.entries.get(user_id)
+        if entry and entry['fingerprint'] == fingerprint:
+            return entry['params']
+        return None
+    
+    def put(self, user_id: str, fingerprint: str, params: Dict):
+        self.entries[user_id] = {'fingerprint': fingerprint, 'params': params, 'fitted_at': time.time()}
+    
+    def save(self):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_params_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.entries, f)
+        # mkstemp creates 0600 files; workers running as other users must read them
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self.path)
+
+
+def fit_user_parameters(user_episodes: Dict[str, List[Dict]], cache_path: Optional[str] = None,
+                        max_workers: Optional[int] = None, chunk_users: int = 500) -> Dict[str, Dict]:
+    """
+    Fits AdvancedPhysiologyModel parameters for every user.
+    
+    Users whose episode fingerprint matches the cache are skipped; the rest
+    are fitted in chunks across a process pool and written back.
+    
+    Args:
+        user_episodes: user_id -> list of episode dicts (see fit_episodes)
+        cache_path: JSON cache file (None disables caching)
+        max_workers: Process pool size (None = CPU count); 0 runs in-process
+    
+    Returns:
+        user_id -> params dict, usable as AdvancedPhysiologyModel(baseline_params=...)
+    """
+    cache = ParameterFitCache(cache_path) if cache_path else None
+    results, stale, fingerprints = {}, {}, {}
+    for uid, episodes in user_episodes.items():
+        if not episodes:
+            continue
+        fingerprints[uid] = episode_fingerprint(episodes)
+        cached = cache.get(uid, fingerprints[uid]) if cache else None
+        if cached is not None:
+            results[uid] = cached
+        else:
+            stale[uid] = episodes
+    
+    stale_ids = list(stale)
+    chunks = [{uid: stale[uid] for uid in stale_ids[i:i + chunk_users]}
+              for i in range(0, len(stale_ids), chunk_users)]
+    if len(chunks) > 1 and max_workers != 0:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            fitted_chunks = list(pool.map(_fit_users_chunk, chunks))
+    else:
+        fitted_chunks = [_fit_users_chunk(chunk) for chunk in chunks]
+    
+    for fitted in fitted_chunks:
+        for uid, params in fitted.items():
+            results[uid] = params
+            if cache:
+                cache.put(uid, fingerprints[uid], params)
+    if cache and stale:
+        cache.save()
+    return results
+
+
+# --- Batch counterfactual engine ---
+
+def counterfactual_gains(baseline_rq, interventions: Optional[List[str]] = None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Expected RQ gain of every intervention for every baseline state.
+    
+    Same rule as run_counterfactual (boost capped at RQ 100), evaluated in
+    one broadcast: gain = min(boost, 100 - baseline).
+    
+    Args:
+        baseline_rq: (users, offsets) forecast RQ at each time offset, or
+            (users, samples, offsets) Monte Carlo trajectories, in which case
+            the gain is averaged over samples (the cap makes it nonlinear)
+        interventions: Names in INTERVENTION_BOOSTS (default: all)
+    
+    Returns:
+        (gains of shape (users, interventions, offsets), intervention names)
+    """
+    names = list(interventions or INTERVENTION_BOOSTS)
+    boosts = np.array([INTERVENTION_BOOSTS.get(name, 0.0) for name in names])
+    baseline = np.asarray(baseline_rq, dtype=np.float64)
+    if baseline.ndim == 1:
+        baseline = baseline[:, None]
+    
+    headroom = np.maximum(100.0 - baseline, 0.0)
+    if baseline.ndim == 3:
+        gains = np.minimum(boosts[None, :, None, None], headroom[:, None, :, :]).mean(axis=2)
+    else:
+        gains = np.minimum(boosts[None, :, None], headroom[:, None, :])
+    return gains, names
+
+
+def plan_interventions(baseline_rq, time_offsets=None, interventions: Optional[List[str]] = None) -> Dict:
+    """
+    Ranks interventions × time offsets for many users in one call.
+    
+    Args:
+        baseline_rq: See counterfactual_gains
+        time_offsets: Label for each offset column (e.g. hours from now)
+    
+    Returns:
+        Dict with 'gains' (users, interventions, offsets), 'interventions',
+        'time_offsets', and the argmax plan per user: 'best_intervention',
+        'best_offset', 'best_gain' (ties go to the earliest offset, then
+        the first intervention listed)
+    """
+    gains, names = counterfactual_gains(baseline_rq, interventions)
+    n_users, n_interventions, n_offsets = gains.shape
+    offsets = np.arange(n_offsets) if time_offsets is None else np.asarray(time_offsets)
+    
+    # Offset-major flattening so argmax prefers earlier offsets on ties
+    flat = gains.transpose(0, 2, 1).reshape(n_users, -1)
+    best = np.argmax(flat, axis=1)
+    best_offset_idx, best_intervention_idx = np.divmod(best, n_interventions)
+    return {
+        'gains': gains,
+        'interventions': names,
+        'time_offsets': offsets,
+        'best_intervention': np.asarray(names)[best_intervention_idx],
+        'best_offset': offsets[best_offset_idx],
+        'best_gain': flat[np.arange(n_users), best]
+    }
@@ -46,8 +46,10 @@ def render_resilience_mapping_page():
     </style>
     """, unsafe_allow_html=True)
     
-    # Initialize engine
-    engine = ResilienceMappingEngine(min_n=10)
+    # Initialize engine once per session; its rollup cube updates incrementally
+    if 'mapping_engine' not in st.session_state:
+        st.session_state.mapping_engine = ResilienceMappingEngine(min_n=10)
+    engine = st.session_state.mapping_engine
     
     # Initialize session state
     if 'mapping_time_window' not in st.session_state:
@@ -419,32 +421,74 @@ header {visibility: hidden;}
     # CONDITIONAL RENDERING BASED ON VIEW
     if st.session_state.resilience_view == 'national':
         # NATIONAL VIEW
-        render_national_view()
+        render_national_view(engine)
     else:
         # SCHOOL/CITY VIEW (existing code)
         render_school_city_view(engine)
 
 
-def render_national_view():
+def render_tile_map(tiles, key):
+    """Render pre-aggregated map tiles as a resilience bubble map"""
+    if not tiles:
+        st.markdown('<div style="color: #94a3b8; font-size: 0.85rem;">No areas meet the minimum participant threshold for this period.</div>', unsafe_allow_html=True)
+        return
+    
+    band_colors = {'red': '#ef4444', 'yellow': '#fbbf24', 'green': '#10b981'}
+    fig_map = go.Figure(go.Scattergeo(
+        lat=[t['lat'] for t in tiles],
+        lon=[t['lon'] for t in tiles],
+        mode='markers',
+        marker=dict(
+            size=[min(40, 8 + t['participant_count'] ** 0.5) for t in tiles],
+            color=[band_colors[t['color_band']] for t in tiles],
+            opacity=0.8,
+            line=dict(width=1, color='#0a0e27')
+        ),
+        customdata=[[t['avg_rq'], t['participant_count'], t['location_count']] for t in tiles],
+        hovertemplate='Avg RQ: %{customdata[0]}<br>Participants: %{customdata[1]}<br>Locations: %{customdata[2]}<extra></extra>'
+    ))
+    fig_map.update_geos(
+        fitbounds='locations',
+        showland=True, landcolor='#1e293b',
+        showocean=True, oceancolor='#0a0e27',
+        showcountries=True, countrycolor='rgba(148,163,184,0.3)',
+        bgcolor='rgba(0,0,0,0)'
+    )
+    fig_map.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=320,
+        margin=dict(l=0, r=0, t=0, b=0)
+    )
+    st.plotly_chart(fig_map, use_container_width=True, key=key)
+
+
+def render_national_view(engine):
     """Render National View with city-level statistics"""
     
     # National header
     st.markdown('<h3 style="color: #06b6d4;">🌍 National Resilience - All Cities (Ireland)</h3>', unsafe_allow_html=True)
     
-    # National stats using columns
+    # National stats from the visible map tiles
+    tiles = engine.get_map_tiles('national', st.session_state.mapping_time_window)
+    active_users = engine.map_participant_count('national', st.session_state.mapping_time_window)
+    tile_weight = sum(t['participant_count'] for t in tiles)
+    national_rq = sum(t['avg_rq'] * t['participant_count'] for t in tiles) / tile_weight if tile_weight else 0
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.markdown('<div style="text-align: center; padding: 20px; background: rgba(30, 41, 59, 0.8); border-radius: 12px;"><div style="color: #06b6d4; font-size: 2.5rem; font-weight: 900;">66.3</div><div style="color: #94a3b8; font-size: 0.85rem;">Average RQ Score</div></div>', unsafe_allow_html=True)
+        st.markdown(f'<div style="text-align: center; padding: 20px; background: rgba(30, 41, 59, 0.8); border-radius: 12px;"><div style="color: #06b6d4; font-size: 2.5rem; font-weight: 900;">{national_rq:.1f}</div><div style="color: #94a3b8; font-size: 0.85rem;">Average RQ Score</div></div>', unsafe_allow_html=True)
     
     with col2:
-        st.markdown('<div style="text-align: center; padding: 20px; background: rgba(30, 41, 59, 0.8); border-radius: 12px;"><div style="color: #06b6d4; font-size: 2.5rem; font-weight: 900;">12,847</div><div style="color: #94a3b8; font-size: 0.85rem;">Active Users</div></div>', unsafe_allow_html=True)
+        st.markdown(f'<div style="text-align: center; padding: 20px; background: rgba(30, 41, 59, 0.8); border-radius: 12px;"><div style="color: #06b6d4; font-size: 2.5rem; font-weight: 900;">{active_users:,}</div><div style="color: #94a3b8; font-size: 0.85rem;">Active Users</div></div>', unsafe_allow_html=True)
     
     with col3:
-        st.markdown('<div style="text-align: center; padding: 20px; background: rgba(30, 41, 59, 0.8); border-radius: 12px;"><div style="color: #06b6d4; font-size: 2.5rem; font-weight: 900;">6</div><div style="color: #94a3b8; font-size: 0.85rem;">Participating Cities</div></div>', unsafe_allow_html=True)
+        st.markdown(f'<div style="text-align: center; padding: 20px; background: rgba(30, 41, 59, 0.8); border-radius: 12px;"><div style="color: #06b6d4; font-size: 2.5rem; font-weight: 900;">{len(tiles)}</div><div style="color: #94a3b8; font-size: 0.85rem;">Reporting Regions</div></div>', unsafe_allow_html=True)
     
     st.markdown('<br>', unsafe_allow_html=True)
     
+    render_tile_map(tiles, key="national_tile_map")
+    
     # City list with resilience scores
     cities_data = [
         {"name": "Dublin", "population": "1.4M", "rq": 64.2, "color": "#f59e0b"},
@@ -544,8 +588,13 @@ def render_school_city_view(engine):
     
     st.markdown('</div>', unsafe_allow_html=True)
     
+    # City map of visible tiles
+    if st.session_state.resilience_view == 'city':
+        render_tile_map(engine.get_map_tiles('city', st.session_state.mapping_time_window), key="city_tile_map")
+    
     # Heatmap Header
-    st.markdown('<div class="heatmap-title">School Stress Heatmap (This week)</div>', unsafe_allow_html=True)
+    window_label = {'day': 'Last day', 'week': 'Last 7 days', 'month': 'Last 30 days'}[st.session_state.mapping_time_window]
+    st.markdown(f'<div class="heatmap-title">School Stress Heatmap ({window_label})</div>', unsafe_allow_html=True)
     st.markdown('<div class="heatmap-subtitle">Aggregated resilience signals across locations (Only locations based on student data shown on campus environment)</div>', unsafe_allow_html=True)
     
     # Get location data
@@ -598,7 +647,7 @@ def render_school_city_view(engine):
             # Peak Stress Times
             st.markdown('<div class="detail-title">📊 Peak Stress Times</div>', unsafe_allow_html=True)
             
-            peak_times = engine.generate_peak_stress_times(location_name)
+            peak_times = engine.generate_peak_stress_times(location_name, st.session_state.mapping_time_window)
             hours = list(peak_times.keys())
             intensities = list(peak_times.values())
             
@@ -680,7 +729,7 @@ def render_school_city_view(engine):
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Policy & Public Health Insights Panel
-    insights = engine.generate_policy_insights(locations_data)
+    insights = engine.generate_policy_insights(locations_data, st.session_state.mapping_time_window)
     
     st.markdown('<div class="policy-panel">', unsafe_allow_html=True)
     st.markdown('<div class="policy-title">📈 Stress Temporal Trends for Public Health Policy</div>', unsafe_allow_html=True)
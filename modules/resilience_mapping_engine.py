@@ -3,11 +3,113 @@ Community Resilience Mapping - Data Engine
 Population-level analytics for environmental stress patterns.
 K-anonymized aggregation with strict privacy safeguards.
 """
+import calendar
 import numpy as np
 import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+from .resilience_rollup import (RollupCube, k_anonymity_masks, hll_estimate, hll_lower_bound,
+                                HLL_REGISTERS, SECONDS_PER_DAY, WEEKDAY_NAMES)
+from .spatial_tiles import TileIndex
+
+# Participant-level record columns (one row per participant per day at a location)
+RECORD_FIELDS = ('location', 'day', 'participant', 'rq', 'recovery_minutes',
+                 'stress_events', 'unresolved_events')
+RECORD_DTYPES = {
+    'location': np.int32,
+    'day': np.int32,           # days since 1970-01-01
+    'participant': np.int64,
+    'rq': np.float64,
+    'recovery_minutes': np.float64,
+    'stress_events': np.int32,
+    'unresolved_events': np.int32
+}
+
+# Map viewports: tile zoom and (south, west, north, east) bounds
+MAP_VIEWS = {
+    'national': {'zoom': 7, 'bbox': (51.3, -10.7, 55.5, -5.9)},    # Ireland
+    'city': {'zoom': 16, 'bbox': (53.335, -6.275, 53.352, -6.240)}  # Dublin City Centre
+}
+
+
+def simulate_participant_records(capacities, days: int = 35, min_n: int = 10,
+                                 end_day: Optional[int] = None, seed=None) -> Dict[str, np.ndarray]:
+    """
+    Demo participant records over the last `days` days: each location draws
+    between min_n and its capacity distinct visitors per day from a pool
+    of `capacity` participants.
+    """
+    rng = np.random.default_rng(seed)
+    capacities = np.asarray(capacities, dtype=np.int64)
+    if end_day is None:
+        end_day = int(np.datetime64(datetime.now().date(), 'D').astype(np.int64))
+    n_locations = len(capacities)
+    day_index = np.arange(end_day - days + 1, end_day + 1)
+
+    visitors = rng.integers(min_n, np.maximum(capacities, min_n + 1)[:, None], size=(n_locations, days))
+    location = np.repeat(np.repeat(np.arange(n_locations), days), visitors.ravel())
+    day = np.repeat(np.tile(day_index, n_locations), visitors.ravel())
+    # Participants are numbered per location; offsets keep them distinct across locations
+    offsets = np.concatenate([[0], np.cumsum(capacities)[:-1]])
+    participant = offsets[location] + (rng.random(len(location)) * capacities[location]).astype(np.int64)
+
+    n = len(location)
+    stress_events = rng.integers(0, 7, size=n)
+    return {
+        'location': location.astype(np.int32),
+        'day': day.astype(np.int32),
+        'participant': participant,
+        'rq': rng.integers(35, 96, size=n).astype(np.float64),
+        'recovery_minutes': rng.uniform(3, 10, size=n),
+        'stress_events': stress_events.astype(np.int32),
+        'unresolved_events': rng.binomial(stress_events, rng.uniform(0.05, 0.35, size=n)).astype(np.int32)
+    }
+
+
+# Demo school-day stress profile (08:00-18:00): mean intensity and relative event rate
+DEMO_STRESS_HOURS = np.arange(8, 19)
+DEMO_STRESS_INTENSITY = np.array([55, 72, 55, 55, 40, 55, 72, 55, 55, 40, 55], dtype=np.float64)
+DEMO_STRESS_RATE = np.array([1.0, 1.6, 1.2, 1.1, 0.6, 1.0, 1.5, 1.1, 1.0, 0.7, 0.5])
+
+
+def simulate_stress_events(records: Dict[str, np.ndarray], seed=None) -> Dict[str, np.ndarray]:
+    """
+    Demo timestamped stress events: one per counted stress event in the
+    participant records, placed in school hours following DEMO_STRESS_RATE.
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.asarray(records['stress_events'], dtype=np.int64)
+    location = np.repeat(records['location'], counts)
+    day = np.repeat(np.asarray(records['day'], dtype=np.int64), counts)
+    slot = rng.choice(len(DEMO_STRESS_HOURS), size=len(day), p=DEMO_STRESS_RATE / DEMO_STRESS_RATE.sum())
+    seconds = (day * SECONDS_PER_DAY + DEMO_STRESS_HOURS[slot] * 3600
+               + rng.integers(0, 3600, size=len(day)))
+    intensity = np.clip(DEMO_STRESS_INTENSITY[slot] + rng.normal(0, 10, size=len(day)), 0, 100)
+    return {
+        'location': location,
+        'timestamp': seconds.astype('datetime64[s]'),
+        'intensity': intensity
+    }
+
+
+def _hour_range_label(hour: int) -> str:
+    """Hour bin as a clock range, e.g. 14 -> '2-3 PM'."""
+    def clock(h):
+        h %= 24
+        return (h % 12 or 12), ('AM' if h < 12 else 'PM')
+    start, start_suffix = clock(hour)
+    end, end_suffix = clock(hour + 1)
+    if start_suffix == end_suffix:
+        return f"{start}-{end} {end_suffix}"
+    return f"{start} {start_suffix}-{end} {end_suffix}"
+
+
+def format_recovery(minutes: float) -> str:
+    """Minutes as 'M:SS'."""
+    return f"{int(minutes)}:{int((minutes % 1) * 60):02d}"
+
+
 class ResilienceMappingEngine:
     """
     Core calculation engine for Community Resilience Mapping.
@@ -19,12 +121,17 @@ class ResilienceMappingEngine:
     - K-anonymization enforced
     """
     
-    def __init__(self, min_n=10):
+    def __init__(self, min_n=10, records: Optional[Dict[str, np.ndarray]] = None,
+                 stress_events: Optional[Dict[str, np.ndarray]] = None):
         """
         Initialize mapping engine.
         
         Args:
             min_n: Minimum participants per location (default: 10)
+            records: Participant-level columnar records (see RECORD_FIELDS);
+                demo records are simulated when omitted
+            stress_events: Timestamped events ({location, timestamp, intensity});
+                simulated from the demo records when those are simulated
         """
         self.min_n = min_n
         
@@ -34,69 +141,243 @@ class ResilienceMappingEngine:
                 'name': 'Science Wing',
                 'type': 'classroom',
                 'building': 'Main Building',
-                'capacity': 120
+                'capacity': 120,
+                'lat': 53.3441,
+                'lon': -6.2527
             },
             {
                 'name': 'Library',
                 'type': 'study_space',
                 'building': 'Library Building',
-                'capacity': 200
+                'capacity': 200,
+                'lat': 53.3438,
+                'lon': -6.2566
             },
             {
                 'name': 'Sports Hall',
                 'type': 'sports',
                 'building': 'Athletics Complex',
-                'capacity': 150
+                'capacity': 150,
+                'lat': 53.3436,
+                'lon': -6.2493
             },
             {
                 'name': 'Cafeteria',
                 'type': 'dining',
                 'building': 'Student Center',
-                'capacity': 300
+                'capacity': 300,
+                'lat': 53.3446,
+                'lon': -6.258
             },
             {
                 'name': 'Computer Lab',
                 'type': 'lab',
                 'building': 'Tech Building',
-                'capacity': 80
+                'capacity': 80,
+                'lat': 53.3431,
+                'lon': -6.251
             }
         ]
+        self.location_index = {loc['name']: i for i, loc in enumerate(self.locations)}
+        self.buildings = list(dict.fromkeys(loc['building'] for loc in self.locations))
+        
+        # Pre-aggregated (location, building, day) cells; raw records are not retained
+        self.cube = RollupCube(
+            [self.buildings.index(loc['building']) for loc in self.locations], len(self.buildings)
+        )
+        self._masks = {}
+        self._tiles = {}
+        if records is None:
+            records = simulate_participant_records(
+                [loc['capacity'] for loc in self.locations], min_n=min_n
+            )
+            if stress_events is None:
+                stress_events = simulate_stress_events(records)
+        self.ingest_records(**records)
+        if stress_events is not None:
+            self.ingest_stress_events(**stress_events)
+    
+    def ingest_records(self, location, day, participant, rq, recovery_minutes,
+                       stress_events, unresolved_events):
+        """
+        Fold participant-level records (aligned arrays) into the rollup cube.
+        
+        Args:
+            location: Location codes or names from self.locations
+            day: Day numbers since epoch, or datetime64/date values
+            participant: Participant ids (only counted, never exposed)
+            rq, recovery_minutes, stress_events, unresolved_events: Per-record values
+        """
+        location = np.asarray(location)
+        if location.dtype.kind in 'US':
+            location = np.array([self.location_index[name] for name in location], dtype=np.int32)
+        day = np.asarray(day)
+        if day.dtype.kind != 'i':
+            day = day.astype('datetime64[D]').astype(np.int64)
+        
+        batch = dict(zip(RECORD_FIELDS, (location, day, participant, rq, recovery_minutes,
+                                         stress_events, unresolved_events)))
+        self.cube.add_records(**{name: np.asarray(values, dtype=RECORD_DTYPES[name])
+                                 for name, values in batch.items()})
+    
+    def ingest_stress_events(self, location, timestamp, intensity):
+        """
+        Fold timestamped stress events into the rollup cube's hourly and
+        day-of-week histograms.
+        
+        Args:
+            location: Location codes or names from self.locations
+            timestamp: Local datetime64 values (or epoch seconds)
+            intensity: Stress intensity (0-100)
+        """
+        location = np.asarray(location)
+        if location.dtype.kind in 'US':
+            location = np.array([self.location_index[name] for name in location], dtype=np.int32)
+        self.cube.add_stress_events(location, timestamp, intensity)
+    
+    def aggregate_all(self, time_window: str = 'week', level: str = 'location') -> Dict[str, np.ndarray]:
+        """
+        Metrics for every (group, time bucket) cell at the given level
+        ('location', 'building' or 'campus'), merged from the rollup cube
+        and cached until the next ingest. See RollupCube.view().
+        """
+        return self.cube.view(time_window, level)
+    
+    def suppression_masks(self, time_window: str = 'week') -> Dict[str, np.ndarray]:
+        """
+        k-anonymity masks for every (group, bucket) cell of each level.
+        
+        PRIVACY SAFEGUARD: Applies the min_n rule to the conservative
+        participant lower bound and combines it with complementary
+        suppression across location -> building -> campus, so no suppressed
+        cell can be recovered by differencing published totals. Cached
+        until the next ingest.
+        
+        Returns:
+            Dict of boolean masks keyed by 'location', 'building', 'campus'
+        """
+        key = (time_window, self.cube.version)
+        if key not in self._masks:
+            self._masks = {key: k_anonymity_masks(
+                self.aggregate_all(time_window, 'location')['participant_lower_bound'],
+                self.aggregate_all(time_window, 'building')['participant_lower_bound'],
+                self.aggregate_all(time_window, 'campus')['participant_lower_bound'],
+                self.cube.location_building,
+                self.min_n
+            ), **{k: v for k, v in self._masks.items() if k[1] == self.cube.version}}
+        return self._masks[key]
+    
+    def tile_index(self, time_window: str = 'week') -> TileIndex:
+        """
+        Spatial tile pyramid over the current window's location cells.
+        
+        PRIVACY SAFEGUARD: Only published (non-suppressed) location cells
+        contribute, so no tile total can expose a suppressed location.
+        Rebuilt only after new records arrive.
+        """
+        key = (time_window, self.cube.version)
+        if key not in self._tiles:
+            cells = self.cube.merged(time_window, 'location')
+            if len(cells['buckets']):
+                published = ~self.suppression_masks(time_window)['location'][:, -1]
+                stats = {'locations': published.astype(np.float64)}
+                for name in ('count', 'rq_sum', 'recovery_sum', 'stress_events', 'unresolved_events'):
+                    stats[name] = np.where(published, cells[name][:, -1], 0)
+                registers = np.where(published[:, None], cells['hll'][:, -1], 0).astype(np.uint8)
+            else:
+                stats = {name: np.zeros(len(self.locations)) for name in
+                         ('locations', 'count', 'rq_sum', 'recovery_sum',
+                          'stress_events', 'unresolved_events')}
+                registers = np.zeros((len(self.locations), HLL_REGISTERS), dtype=np.uint8)
+            self._tiles = {key: TileIndex(
+                [loc['lat'] for loc in self.locations], [loc['lon'] for loc in self.locations], stats,
+                sketches={'hll': registers}
+            )}
+        return self._tiles[key]
+    
+    def get_map_tiles(self, view: str = 'national', time_window: str = 'week') -> List[Dict]:
+        """
+        Aggregated resilience statistics for the tiles visible in a map view.
+        
+        PRIVACY SAFEGUARD: Tiles are omitted unless a conservative lower
+        bound (HLL estimate minus 3 standard errors) reaches min_n. Tile
+        participants are the max-merged sketches of their locations, so
+        people active in several locations are counted once.
+        
+        Args:
+            view: Key of MAP_VIEWS ('national' or 'city')
+            time_window: 'day', 'week', or 'month'
+        
+        Returns:
+            List of {lat, lon, zoom, location_count, participant_count, avg_rq,
+            avg_recovery_speed, color_band}
+        """
+        viewport = MAP_VIEWS[view]
+        tiles = self.tile_index(time_window).query(viewport['zoom'], *viewport['bbox'])
+        participant_count = hll_estimate(tiles['hll'])
+        keep = (hll_lower_bound(tiles['hll']) >= self.min_n) & (tiles['count'] > 0)
+        
+        result = []
+        for i in np.flatnonzero(keep):
+            avg_rq = tiles['rq_sum'][i] / tiles['count'][i]
+            result.append({
+                'lat': float(tiles['lat'][i]),
+                'lon': float(tiles['lon'][i]),
+                'zoom': viewport['zoom'],
+                'location_count': int(tiles['locations'][i]),
+                'participant_count': int(round(participant_count[i])),
+                'avg_rq': round(float(avg_rq), 1),
+                'avg_recovery_speed': format_recovery(tiles['recovery_sum'][i] / tiles['count'][i]),
+                'color_band': self.calculate_composite_resilience({'avg_rq': int(avg_rq)})['color_band']
+            })
+        return result
+    
+    def map_participant_count(self, view: str = 'national', time_window: str = 'week') -> int:
+        """
+        Distinct participants across the published tiles of a map view.
+        
+        The visible tiles' sketches are max-merged and estimated once, so
+        people active in several tiles are counted once.
+        """
+        viewport = MAP_VIEWS[view]
+        tiles = self.tile_index(time_window).query(viewport['zoom'], *viewport['bbox'])
+        keep = (hll_lower_bound(tiles['hll']) >= self.min_n) & (tiles['count'] > 0)
+        if not keep.any():
+            return 0
+        return int(round(float(hll_estimate(tiles['hll'][keep].max(axis=0)))))
     
     def aggregate_location_data(self, location_name: str, time_window: str = 'week') -> Optional[Dict]:
         """
         Aggregate resilience data for a location.
         
-        PRIVACY SAFEGUARD: Returns None if N < min_n
+        PRIVACY SAFEGUARD: Returns None if N < min_n or the cell is
+        complementarily suppressed (see suppression_masks)
         
         Args:
             location_name: Name of location
-            time_window: 'day', 'week', or 'month'
+            time_window: 'day', 'week', or 'month' (rolling 1, 7 or 30
+                days ending on the latest data day)
         
         Returns:
             Aggregated data dict or None if suppressed
         """
-        # Simulate participant count (always ≥ min_n for demo)
-        participant_count = random.randint(self.min_n, 150)
-        
-        # PRIVACY CHECK: Suppress if below threshold
-        if participant_count < self.min_n:
+        aggregates = self.aggregate_all(time_window)
+        if len(aggregates['buckets']) == 0:
             return None
         
-        # Generate aggregated RQ scores (no individual data)
-        rq_scores = [random.randint(35, 95) for _ in range(participant_count)]
-        avg_rq = int(np.mean(rq_scores))
-        
-        # Calculate recovery speed (aggregated)
-        recovery_times = [random.uniform(3, 10) for _ in range(participant_count)]
-        avg_recovery_minutes = np.mean(recovery_times)
-        recovery_str = f"{int(avg_recovery_minutes)}:{int((avg_recovery_minutes % 1) * 60):02d}"
+        # Current window = the rolling window ending on the latest data day
+        loc = self.location_index[location_name]
+        participant_count = int(round(aggregates['participant_count'][loc, -1]))
         
-        # Calculate stress event frequency
-        stress_events = [random.randint(5, 30) for _ in range(participant_count)]
-        avg_stress_events = int(np.mean(stress_events))
+        # PRIVACY CHECK: Suppress if below threshold or exposed by differencing
+        if self.suppression_masks(time_window)['location'][loc, -1]:
+            return None
         
-        # Unresolved stress percentage
-        unresolved_pct = random.randint(5, 35)
+        avg_rq = int(aggregates['avg_rq'][loc, -1])
+        recovery_str = format_recovery(aggregates['avg_recovery_minutes'][loc, -1])
+        avg_stress_events = int(aggregates['avg_stress_events'][loc, -1])
+        unresolved = aggregates['unresolved_stress_pct'][loc, -1]
+        unresolved_pct = int(unresolved) if np.isfinite(unresolved) else 0
         
         return {
             'location': location_name,
@@ -148,31 +429,53 @@ class ResilienceMappingEngine:
             'trend_value': trend_value
         }
     
-    def generate_peak_stress_times(self, location_name: str) -> Dict[str, int]:
+    def generate_peak_stress_times(self, location_name: str, time_window: str = 'week') -> Dict[str, int]:
         """
-        Generate hourly stress intensity histogram.
+        Hourly stress intensity histogram from recorded stress events.
+        
+        PRIVACY SAFEGUARD: Empty for suppressed locations
         
         Args:
             location_name: Name of location
+            time_window: 'day', 'week', or 'month' (latest rolling window)
         
         Returns:
-            Dict mapping hour to stress intensity (0-100)
+            Dict mapping hour ('HH:00') to mean stress intensity (0-100),
+            for hours with recorded events
         """
-        peak_times = {}
+        loc = self.location_index[location_name]
+        masks = self.suppression_masks(time_window)['location']
+        if masks.shape[1] == 0 or masks[loc, -1]:
+            return {}
         
-        # School hours: 8 AM - 6 PM
-        for hour in range(8, 19):
-            # Simulate stress patterns
-            if hour in [9, 14]:  # Peak times (class start, post-lunch)
-                intensity = random.randint(60, 85)
-            elif hour in [12, 17]:  # Lower times (lunch, end of day)
-                intensity = random.randint(30, 50)
-            else:
-                intensity = random.randint(40, 70)
-            
-            peak_times[f"{hour:02d}:00"] = intensity
+        histograms = self.cube.stress_histograms(time_window)
+        hour_mean = histograms['hour_mean'][loc]
+        return {
+            f"{hour:02d}:00": int(round(hour_mean[hour]))
+            for hour in np.flatnonzero(histograms['hour_count'][loc] > 0)
+        }
+    
+    def generate_weekday_stress(self, location_name: str, time_window: str = 'month') -> Dict[str, int]:
+        """
+        Day-of-week stress intensity histogram from recorded stress events.
         
-        return peak_times
+        PRIVACY SAFEGUARD: Empty for suppressed locations
+        
+        Returns:
+            Dict mapping weekday ('Mon'..'Sun') to mean stress intensity,
+            for days with recorded events
+        """
+        loc = self.location_index[location_name]
+        masks = self.suppression_masks(time_window)['location']
+        if masks.shape[1] == 0 or masks[loc, -1]:
+            return {}
+        
+        histograms = self.cube.stress_histograms(time_window)
+        weekday_mean = histograms['weekday_mean'][loc]
+        return {
+            WEEKDAY_NAMES[day]: int(round(weekday_mean[day]))
+            for day in np.flatnonzero(histograms['weekday_count'][loc] > 0)
+        }
     
     def calculate_recovery_patterns(self, location_data: Dict) -> Dict:
         """
@@ -287,58 +590,93 @@ class ResilienceMappingEngine:
         
         return action_items
     
-    def generate_policy_insights(self, locations_data: List[Dict]) -> List[str]:
+    def generate_policy_insights(self, locations_data: List[Dict],
+                                 time_window: Optional[str] = None) -> List[str]:
         """
         Generate population-level policy insights.
         
+        PRIVACY SAFEGUARD: Only published locations contribute to the
+        resilience insights, and temporal insights are omitted while the
+        campus cell is suppressed.
+        
         Args:
             locations_data: List of location data
+            time_window: Window of the temporal insights (default: that of
+                locations_data, else 'week')
         
         Returns:
             List of insight strings
         """
         insights = []
         
-        # Calculate overall patterns
+        # Calculate overall patterns (published locations only)
         avg_scores = [loc['composite_resilience'] for loc in locations_data]
-        overall_avg = np.mean(avg_scores)
-        
-        # Insight 1: Overall resilience level
-        if overall_avg >= 75:
-            insights.append(
-                "Population-level resilience across campus is strong. "
-                "Current environmental configurations appear to support adaptive capacity."
-            )
-        elif overall_avg >= 50:
-            insights.append(
-                "Population-level resilience shows moderate patterns. "
-                "Consider targeted environmental optimizations in specific zones."
-            )
-        else:
-            insights.append(
-                "Population-level resilience indicates systemic strain patterns. "
-                "Comprehensive environmental and schedule review recommended."
+        if avg_scores:
+            overall_avg = np.mean(avg_scores)
+            
+            # Insight 1: Overall resilience level
+            if overall_avg >= 75:
+                insights.append(
+                    "Population-level resilience across campus is strong. "
+                    "Current environmental configurations appear to support adaptive capacity."
+                )
+            elif overall_avg >= 50:
+                insights.append(
+                    "Population-level resilience shows moderate patterns. "
+                    "Consider targeted environmental optimizations in specific zones."
+                )
+            else:
+                insights.append(
+                    "Population-level resilience indicates systemic strain patterns. "
+                    "Comprehensive environmental and schedule review recommended."
+                )
+            
+            # Insight 2: Variability across locations
+            score_std = np.std(avg_scores)
+            if score_std > 15:
+                insights.append(
+                    "Significant variability detected across locations. "
+                    "This suggests environmental factors play a substantial role in resilience outcomes."
+                )
+        
+        # Insight 3: Temporal patterns (campus-wide event histograms)
+        if time_window is None:
+            time_window = locations_data[0].get('time_window', 'week') if locations_data else 'week'
+        # PRIVACY CHECK: Campus histograms are only published with the campus cell
+        campus = self.suppression_masks(time_window)['campus']
+        if campus.shape[1] == 0 or campus[0, -1]:
+            return insights
+        histograms = self.cube.stress_histograms(time_window, level='campus')
+        hour_mean = histograms['hour_mean'][0]
+        observed = np.flatnonzero(histograms['hour_count'][0] > 0)
+        if len(observed) >= 2:
+            peaks = observed[np.argsort(-hour_mean[observed], kind='stable')[:2]]
+            peaks.sort()
+            peak_text = " and ".join(
+                f"{_hour_range_label(hour)} (intensity {hour_mean[hour]:.0f}/100)" for hour in peaks
             )
-        
-        # Insight 2: Variability across locations
-        score_std = np.std(avg_scores)
-        if score_std > 15:
             insights.append(
-                "Significant variability detected across locations. "
-                "This suggests environmental factors play a substantial role in resilience outcomes."
+                f"Peak stress times occur at {peak_text}. "
+                "Consider schedule modifications or break periods during these windows."
             )
         
-        # Insight 3: Temporal patterns
-        insights.append(
-            "Peak stress times consistently occur during mid-morning (9-10 AM) and early afternoon (2-3 PM). "
-            "Consider schedule modifications or break periods during these windows."
-        )
+        weekday_mean = histograms['weekday_mean'][0]
+        observed_days = np.flatnonzero(histograms['weekday_count'][0] > 0)
+        if len(observed_days) >= 3:
+            peak_day = observed_days[np.argmax(weekday_mean[observed_days])]
+            week_mean = np.mean(weekday_mean[observed_days])
+            if weekday_mean[peak_day] - week_mean >= 5:
+                insights.append(
+                    f"Stress intensity is highest on {calendar.day_name[peak_day]}s "
+                    f"(mean {weekday_mean[peak_day]:.0f}/100 vs {week_mean:.0f} across the week)."
+                )
         
         return insights
     
     def suppress_if_below_threshold(self, data: Dict) -> Optional[Dict]:
         """
-        Privacy guard: Suppress data if participant count < min_n.
+        Privacy guard: Suppress data if participant count < min_n, or if
+        the location's current cell is complementarily suppressed.
         
         Args:
             data: Location data with participant_count
@@ -348,6 +686,11 @@ class ResilienceMappingEngine:
         """
         if data.get('participant_count', 0) < self.min_n:
             return None
+        location = data.get('location')
+        if location in self.location_index and 'time_window' in data:
+            # Cells published from the cube also honour complementary suppression
+            if self.suppression_masks(data['time_window'])['location'][self.location_index[location], -1]:
+                return None
         return data
     
     def get_all_locations_data(self, time_window: str = 'week') -> List[Dict]:
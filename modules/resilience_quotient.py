@@ -10,15 +10,21 @@ import numpy as np
 import random
 from datetime import datetime
 from .rq_calculator import RQCalculator
+from .rq_history import RQHistoryStore
+
+# Stress events observed per RQ update (simulated sensor feed), stored in the history
+STRESS_EVENTS_PER_UPDATE = 3
 
 def render_resilience_quotient_page():
     # Force reload - v2.0 NEW UI
     # Initialize calculator
-    calc = RQCalculator()
-    
     # Initialize session state for persistent RQ tracking
     if 'rq_history' not in st.session_state:
         st.session_state.rq_history = []
+    if 'rq_history_store' not in st.session_state:
+        st.session_state.rq_history_store = RQHistoryStore()
+    user_id = st.session_state.get('user_id', 'current_user')
+    calc = RQCalculator(history_store=st.session_state.rq_history_store)
     
     # Initialize time period selection
     if 'rq_time_period' not in st.session_state:
@@ -28,6 +34,8 @@ def render_resilience_quotient_page():
     if 'current_rq' not in st.session_state or 'last_rq_update' not in st.session_state:
         st.session_state.current_rq = calc.calculate_rq()
         st.session_state.last_rq_update = datetime.now()
+        calc.record_result(user_id, st.session_state.current_rq)
+        calc.record_stress_events(user_id, calc.generate_stress_response_data(num_events=STRESS_EVENTS_PER_UPDATE))
         # Add to history
         st.session_state.rq_history.append({
             'timestamp': datetime.now(),
@@ -39,6 +47,8 @@ def render_resilience_quotient_page():
         if time_since_update > 300:  # 5 minutes
             st.session_state.current_rq = calc.calculate_rq()
             st.session_state.last_rq_update = datetime.now()
+            calc.record_result(user_id, st.session_state.current_rq)
+            calc.record_stress_events(user_id, calc.generate_stress_response_data(num_events=STRESS_EVENTS_PER_UPDATE))
             st.session_state.rq_history.append({
                 'timestamp': datetime.now(),
                 'rq_score': st.session_state.current_rq['rq_score']
@@ -216,7 +226,7 @@ html, body, [data-testid="stAppViewContainer"] { font-family: 'Inter', sans-seri
     # Generate trend data based on selected period
     period_days = {'7d': 7, '30d': 30, '90d': 90}
     days = period_days.get(st.session_state.rq_time_period, 30)
-    trend_data = calc.generate_trend_data(days=days)
+    trend_data = calc.generate_trend_data(days=days, user_id=user_id)
     dates = [d['date'] for d in trend_data]
     rq_scores = [d['rq_score'] for d in trend_data]
     
@@ -257,7 +267,7 @@ html, body, [data-testid="stAppViewContainer"] { font-family: 'Inter', sans-seri
         # Generate stress response data based on selected period
         num_events = {'7d': 20, '30d': 50, '90d': 150}
         events_count = num_events.get(st.session_state.rq_time_period, 50)
-        stress_events = calc.generate_stress_response_data(num_events=events_count)
+        stress_events = calc.generate_stress_response_data(num_events=events_count, user_id=user_id)
         
         # Separate by category
         fast_events = [e for e in stress_events if e['category'] == "Fast (< 5min)"]
@@ -0,0 +1,455 @@
+"""
+Community Resilience Mapping - Rollup Cube
+Pre-aggregated (location, building, day) cells with mergeable aggregates,
+so week/month and building/campus views are merges of cells rather than
+re-aggregations of raw participant records.
+"""
+import numpy as np
+from typing import Dict, Optional
+
+TIME_WINDOWS = ('day', 'week', 'month')
+WINDOW_DAYS = {'day': 1, 'week': 7, 'month': 30}
+LEVELS = ('location', 'building', 'campus')
+
+# RQ histogram: 10 bins of width 10 over 0-100
+RQ_BIN_EDGES = np.arange(0, 101, 10)
+
+# HyperLogLog sketch for mergeable distinct-participant counts
+# (128 one-byte registers per cell, roughly ±7% relative error)
+HLL_PRECISION = 7
+HLL_REGISTERS = 1 << HLL_PRECISION
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+_HLL_POWERS = np.exp2(-np.arange(256, dtype=np.float64))
+
+# Additive per-cell aggregates (merged by summation)
+SUM_FIELDS = ('count', 'rq_sum', 'rq_sumsq', 'recovery_sum', 'recovery_sumsq',
+              'stress_events', 'unresolved_events')
+
+# Timestamped stress events: intensity histograms by hour of day and day of week
+HOURS_PER_DAY = 24
+DAYS_PER_WEEK = 7
+WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+SECONDS_PER_DAY = 86400
+
+_DAY_CHUNK = 32
+
+
+def window_buckets(days: np.ndarray, time_window: str, end_day: int) -> np.ndarray:
+    """
+    Map day numbers to rolling-window bucket ids.
+    Windows are WINDOW_DAYS long and end on end_day, so bucket 0 is the
+    last full window (e.g. the 7 days through end_day) and earlier
+    windows are -1, -2, ...
+    """
+    if time_window not in WINDOW_DAYS:
+        raise ValueError(f"Unknown time window: {time_window}")
+    days = np.asarray(days, dtype=np.int64)
+    return -((end_day - days) // WINDOW_DAYS[time_window])
+
+
+def _hash64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: well-mixed 64-bit hashes of integer ids."""
+    z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def hll_registers(participant: np.ndarray):
+    """Register index and rank (1 + leading zeros) for each participant id."""
+    h = _hash64(np.asarray(participant, dtype=np.int64))
+    index = (h & np.uint64(HLL_REGISTERS - 1)).astype(np.int64)
+    w = h >> np.uint64(HLL_PRECISION)
+    bits = 64 - HLL_PRECISION
+    # floor(log2(w)) via frexp is exact for integers below 2**53; shift first
+    top = (w >> np.uint64(bits - 52)).astype(np.float64)
+    exponent = np.frexp(top)[1]  # position of the highest set bit, 0 if top == 0
+    rank = np.where(top > 0, 53 - exponent, bits + 1)
+    return index, rank.astype(np.uint8)
+
+
+def hll_estimate(registers: np.ndarray) -> np.ndarray:
+    """Cardinality estimate over the last axis of HLL registers."""
+    m = registers.shape[-1]
+    raw = _HLL_ALPHA * m * m / _HLL_POWERS[registers].sum(axis=-1)
+    zeros = (registers == 0).sum(axis=-1)
+    # Linear counting is far more accurate for small populations
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    estimate = np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+    return np.rint(estimate).astype(np.int64)
+
+
+def hll_lower_bound(registers: np.ndarray, sigmas: float = 3.0) -> np.ndarray:
+    """
+    Conservative cardinality: the estimate minus `sigmas` standard errors
+    (1.04 / sqrt(m) relative), for privacy thresholds on sketched counts.
+    """
+    relative_error = 1.04 / np.sqrt(registers.shape[-1])
+    bound = hll_estimate(registers) * (1.0 - sigmas * relative_error)
+    return np.floor(np.maximum(bound, 0.0)).astype(np.int64)
+
+
+class RollupCube:
+    """
+    Dense (location, day) cube of mergeable aggregates.
+
+    Each cell holds record count, sums and sums of squares of RQ and
+    recovery time, stress/unresolved event totals, an RQ histogram and a
+    HyperLogLog sketch of participants. Buildings are a fixed mapping of
+    locations, so the (location, building, day) key needs no extra axis.
+    Records are folded in incrementally; views cost O(cells), never
+    O(raw records).
+
+    Distinct participants are not additive across days, so they are
+    counted with the mergeable sketch and participant ids are never
+    retained. The sketch can overestimate, so privacy thresholds use its
+    lower bound (hll_lower_bound) rather than the estimate.
+    """
+
+    def __init__(self, location_building: np.ndarray, n_buildings: Optional[int] = None):
+        """
+        Args:
+            location_building: Building code of each location
+            n_buildings: Number of building codes (default: max code + 1)
+        """
+        self.location_building = np.asarray(location_building, dtype=np.int64)
+        self.n_locations = len(self.location_building)
+        self.n_buildings = n_buildings or int(self.location_building.max()) + 1
+        self.first_day = None
+        self.n_days = 0
+        self.data_days = None  # (min, max) day with records
+        # Locations sorted by building, for reduceat merges along axis 0
+        self._building_order = np.argsort(self.location_building, kind='stable')
+        sorted_buildings = self.location_building[self._building_order]
+        self._building_starts = np.flatnonzero(
+            np.concatenate([[True], sorted_buildings[1:] != sorted_buildings[:-1]])
+        )
+        self._building_codes = sorted_buildings[self._building_starts]
+        self.cells: Dict[str, np.ndarray] = {}
+        self.version = 0
+        self._views = {}
+
+    def _allocate(self, n_days: int) -> Dict[str, np.ndarray]:
+        shape = (self.n_locations, n_days)
+        cells = {name: np.zeros(shape, dtype=np.int64 if name in ('count', 'stress_events', 'unresolved_events')
+                                else np.float64) for name in SUM_FIELDS}
+        cells['rq_hist'] = np.zeros(shape + (len(RQ_BIN_EDGES) - 1,), dtype=np.int64)
+        cells['hll'] = np.zeros(shape + (HLL_REGISTERS,), dtype=np.uint8)
+        # Hour-of-day histograms; the weekday follows from the day index
+        cells['stress_hour_count'] = np.zeros(shape + (HOURS_PER_DAY,), dtype=np.int64)
+        cells['stress_hour_sum'] = np.zeros(shape + (HOURS_PER_DAY,), dtype=np.float64)
+        return cells
+
+    def _ensure_days(self, low: int, high: int):
+        """Grow the day axis (in chunks) to cover [low, high]."""
+        if self.first_day is None:
+            self.first_day = low
+            self.n_days = high - low + 1 + _DAY_CHUNK
+            self.cells = self._allocate(self.n_days)
+            return
+        last_day = self.first_day + self.n_days - 1
+        if low >= self.first_day and high <= last_day:
+            return
+        pad_before = max(0, self.first_day - low)
+        pad_after = max(0, high - last_day) + (_DAY_CHUNK if high > last_day else 0)
+        grown = self._allocate(self.n_days + pad_before + pad_after)
+        for name, array in self.cells.items():
+            grown[name][:, pad_before:pad_before + self.n_days] = array
+        self.cells = grown
+        self.first_day -= pad_before
+        self.n_days += pad_before + pad_after
+
+    def _cover_days(self, day: np.ndarray):
+        low, high = int(day.min()), int(day.max())
+        self._ensure_days(low, high)
+        if self.data_days is None:
+            self.data_days = (low, high)
+        else:
+            self.data_days = (min(self.data_days[0], low), max(self.data_days[1], high))
+
+    def add_records(self, location, day, participant, rq, recovery_minutes,
+                    stress_events, unresolved_events):
+        """Fold a batch of participant-level records into their day cells."""
+        location = np.asarray(location, dtype=np.int64)
+        if len(location) == 0:
+            return
+        day = np.asarray(day, dtype=np.int64)
+        rq = np.asarray(rq, dtype=np.float64)
+        recovery = np.asarray(recovery_minutes, dtype=np.float64)
+        self._cover_days(day)
+
+        # Only cells touched by this batch are updated, so an incremental
+        # ingest costs O(batch), not O(cube)
+        cell = location * self.n_days + (day - self.first_day)
+        touched, inverse = np.unique(cell, return_inverse=True)
+        n_touched = len(touched)
+        additions = {
+            'count': np.bincount(inverse, minlength=n_touched),
+            'rq_sum': np.bincount(inverse, weights=rq, minlength=n_touched),
+            'rq_sumsq': np.bincount(inverse, weights=rq * rq, minlength=n_touched),
+            'recovery_sum': np.bincount(inverse, weights=recovery, minlength=n_touched),
+            'recovery_sumsq': np.bincount(inverse, weights=recovery * recovery, minlength=n_touched),
+            'stress_events': np.bincount(inverse, weights=stress_events, minlength=n_touched),
+            'unresolved_events': np.bincount(inverse, weights=unresolved_events, minlength=n_touched),
+        }
+        for name, values in additions.items():
+            target = self.cells[name].reshape(-1)
+            target[touched] += values.astype(target.dtype)
+
+        n_bins = len(RQ_BIN_EDGES) - 1
+        rq_bin = np.clip((rq // 10).astype(np.int64), 0, n_bins - 1)
+        hist = self.cells['rq_hist'].reshape(-1, n_bins)
+        hist[touched] += np.bincount(inverse * n_bins + rq_bin, minlength=n_touched * n_bins).reshape(-1, n_bins)
+
+        index, rank = hll_registers(participant)
+        registers = self.cells['hll'].reshape(-1)
+        np.maximum.at(registers, cell * HLL_REGISTERS + index, rank)
+
+        self.version += 1
+        self._views.clear()
+
+    def add_stress_events(self, location, timestamp, intensity):
+        """
+        Fold timestamped stress events into the hour-of-day intensity
+        histograms of their day cells (touched cells only).
+
+        Args:
+            location: Location codes
+            timestamp: Local datetime64 values or epoch seconds
+            intensity: Stress intensity (0-100)
+        """
+        location = np.asarray(location, dtype=np.int64)
+        if len(location) == 0:
+            return
+        timestamp = np.asarray(timestamp)
+        if timestamp.dtype.kind == 'M':
+            timestamp = timestamp.astype('datetime64[s]')
+        seconds = timestamp.astype(np.int64)
+        intensity = np.asarray(intensity, dtype=np.float64)
+        day = seconds // SECONDS_PER_DAY
+        self._cover_days(day)
+
+        cell = location * self.n_days + (day - self.first_day)
+        touched, inverse = np.unique(cell, return_inverse=True)
+        bin_id = inverse * HOURS_PER_DAY + (seconds % SECONDS_PER_DAY) // 3600
+        size = len(touched) * HOURS_PER_DAY
+        counts = self.cells['stress_hour_count'].reshape(-1, HOURS_PER_DAY)
+        counts[touched] += np.bincount(bin_id, minlength=size).reshape(-1, HOURS_PER_DAY)
+        sums = self.cells['stress_hour_sum'].reshape(-1, HOURS_PER_DAY)
+        sums[touched] += np.bincount(bin_id, weights=intensity, minlength=size).reshape(-1, HOURS_PER_DAY)
+
+        self.version += 1
+        self._views.clear()
+
+    def stress_histograms(self, time_window: str = 'week', level: str = 'location') -> Dict[str, np.ndarray]:
+        """
+        Mean stress intensity by hour of day and day of week for the
+        latest bucket of every group.
+
+        Returns:
+            Dict with 'hour_mean' (n_groups, 24), 'hour_count',
+            'weekday_mean' (n_groups, 7) and 'weekday_count'; NaN where
+            no events were recorded
+        """
+        cells = self.merged(time_window, level)
+        n_groups = len(cells['count'])
+        result = {}
+        if len(cells['buckets']) == 0:
+            for name, bins in (('hour', HOURS_PER_DAY), ('weekday', DAYS_PER_WEEK)):
+                result[f'{name}_count'] = np.zeros((n_groups, bins), dtype=np.int64)
+                result[f'{name}_mean'] = np.full((n_groups, bins), np.nan)
+            return result
+
+        hour_count = cells['stress_hour_count'][:, -1]
+        hour_sum = cells['stress_hour_sum'][:, -1]
+
+        # Weekday histogram: collapse the latest bucket's day cells over hours,
+        # then fold each day into its weekday (Monday = 0)
+        days = self.day_numbers()
+        latest = days[window_buckets(days, time_window, days[-1]) == cells['buckets'][-1]]
+        lo = latest[0] - self.first_day
+        day_count = self.cells['stress_hour_count'][:, lo:lo + len(latest)].sum(axis=2)
+        day_sum = self.cells['stress_hour_sum'][:, lo:lo + len(latest)].sum(axis=2)
+        weekday = np.eye(DAYS_PER_WEEK, dtype=np.int64)[(latest + 3) % DAYS_PER_WEEK]
+        weekday_count = day_count @ weekday
+        weekday_sum = day_sum @ weekday
+        if level == 'building':
+            weekday_count = self._merge_buildings('count', weekday_count)
+            weekday_sum = self._merge_buildings('sum', weekday_sum)
+        elif level == 'campus':
+            weekday_count = weekday_count.sum(axis=0, keepdims=True)
+            weekday_sum = weekday_sum.sum(axis=0, keepdims=True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['hour_mean'] = hour_sum / hour_count
+            result['weekday_mean'] = weekday_sum / weekday_count
+        result['hour_count'] = hour_count
+        result['weekday_count'] = weekday_count
+        return result
+
+    def day_numbers(self) -> np.ndarray:
+        """Day numbers spanned by ingested records."""
+        if self.data_days is None:
+            return np.empty(0, dtype=np.int64)
+        return np.arange(self.data_days[0], self.data_days[1] + 1)
+
+    def merged(self, time_window: str = 'week', level: str = 'location') -> Dict[str, np.ndarray]:
+        """
+        Raw merged aggregates for (group, bucket) cells.
+
+        Days are merged into rolling windows ending on the latest data day
+        with reduceat over contiguous runs, then locations into buildings
+        or the whole campus.
+
+        Returns:
+            Dict with 'buckets' and SUM_FIELDS / 'rq_hist' / 'hll' arrays of
+            shape (n_groups, n_buckets, ...)
+        """
+        key = (time_window, level)
+        if key in self._views:
+            return self._views[key]
+
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level: {level}")
+        days = self.day_numbers()
+        if len(days) == 0:
+            buckets = np.empty(0, dtype=np.int64)
+            cells = self._allocate(0)
+        else:
+            lo = days[0] - self.first_day
+            day_buckets = window_buckets(days, time_window, days[-1])
+            starts = np.flatnonzero(np.concatenate([[True], day_buckets[1:] != day_buckets[:-1]]))
+            buckets = day_buckets[starts]
+            cells = {}
+            for name, array in self.cells.items():
+                array = array[:, lo:lo + len(days)]
+                if time_window != 'day':
+                    array = (np.maximum if name == 'hll' else np.add).reduceat(array, starts, axis=1)
+                cells[name] = array
+
+        if level == 'building':
+            cells = {name: self._merge_buildings(name, array) for name, array in cells.items()}
+        elif level == 'campus':
+            cells = {name: (array.max(axis=0, keepdims=True) if name == 'hll'
+                            else array.sum(axis=0, keepdims=True)) for name, array in cells.items()}
+
+        cells['buckets'] = buckets
+        self._views[key] = cells
+        return cells
+
+    def _merge_buildings(self, name: str, array: np.ndarray) -> np.ndarray:
+        reduce = np.maximum if name == 'hll' else np.add
+        out = np.zeros((self.n_buildings,) + array.shape[1:], dtype=array.dtype)
+        out[self._building_codes] = reduce.reduceat(array[self._building_order], self._building_starts, axis=0)
+        return out
+
+    def view(self, time_window: str = 'week', level: str = 'location') -> Dict[str, np.ndarray]:
+        """
+        Resilience metrics for every (group, bucket) cell.
+
+        Returns:
+            Dict with 'buckets' plus (n_groups, n_buckets) arrays:
+            participant_count (HLL estimate), participant_lower_bound (for
+            privacy thresholds), record_count (participant-days), avg_rq, rq_std,
+            avg_recovery_minutes, avg_stress_events, unresolved_stress_pct
+            and the merged 'rq_hist'. Empty cells are 0 / NaN.
+        """
+        cells = self.merged(time_window, level)
+        count = cells['count']
+        # Distinct participants can never exceed participant-day records
+        participants = np.minimum(hll_estimate(cells['hll']), count)
+        # A cell with records keeps a bound of at least 1, so complementary
+        # suppression still sees it as holding data
+        lower_bound = np.where(count > 0, np.clip(hll_lower_bound(cells['hll']), 1, count), 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_rq = cells['rq_sum'] / count
+            rq_var = np.maximum(cells['rq_sumsq'] / count - avg_rq ** 2, 0.0)
+            return {
+                'buckets': cells['buckets'],
+                'participant_count': participants,
+                'participant_lower_bound': lower_bound,
+                'record_count': count,
+                'avg_rq': avg_rq,
+                'rq_std': np.sqrt(rq_var),
+                'avg_recovery_minutes': cells['recovery_sum'] / count,
+                'avg_stress_events': cells['stress_events'] / participants,
+                'unresolved_stress_pct': 100.0 * cells['unresolved_events'] / cells['stress_events'],
+                'rq_hist': cells['rq_hist'],
+            }
+
+
+def _complement_relation(suppressed: np.ndarray, parent_suppressed: np.ndarray, counts: np.ndarray,
+                         parent_counts: np.ndarray, groups: np.ndarray, n_groups: int) -> bool:
+    """
+    One complementary-suppression pass over parent = sum(children) relations.
+
+    A relation (parent plus its children, per bucket) with exactly one
+    suppressed member lets that member be recovered by differencing, so
+    the smallest published child is suppressed too, or the parent when
+    no child is left to hide. Arrays are updated in place.
+
+    Returns:
+        True if anything new was suppressed
+    """
+    n_children, n_buckets = counts.shape
+    has_data = counts > 0
+    hidden = suppressed & has_data
+    per_group = np.zeros((n_groups, n_buckets), dtype=np.int64)
+    np.add.at(per_group, groups, hidden.astype(np.int64))
+    exposed = (per_group + (parent_suppressed & (parent_counts > 0))) == 1
+    if not exposed.any():
+        return False
+
+    # Smallest published child per (group, bucket): encode (count, child) in
+    # one int64 key so a single minimum also yields the child index
+    candidate = has_data & ~suppressed & exposed[groups]
+    key = np.where(candidate, counts * n_children + np.arange(n_children)[:, None], np.iinfo(np.int64).max)
+    best = np.full((n_groups, n_buckets), np.iinfo(np.int64).max)
+    np.minimum.at(best, groups, key)
+
+    found = best != np.iinfo(np.int64).max
+    group_idx, bucket_idx = np.nonzero(exposed & found)
+    suppressed[best[group_idx, bucket_idx] % n_children, bucket_idx] = True
+    # Nothing left to hide among the children: the parent goes instead
+    parent_extra = exposed & ~found & ~parent_suppressed
+    parent_suppressed |= parent_extra
+    return len(group_idx) > 0 or bool(parent_extra.any())
+
+
+def k_anonymity_masks(location_counts: np.ndarray, building_counts: np.ndarray, campus_counts: np.ndarray,
+                      location_building: np.ndarray, min_n: int = 10) -> Dict[str, np.ndarray]:
+    """
+    Suppression masks for the location -> building -> campus hierarchy.
+
+    Primary suppression hides every cell with fewer than min_n
+    participants. Complementary suppression then ensures no additive
+    relation (building = its locations, campus = its buildings) has
+    exactly one hidden member, repeating until stable. Every pass is a
+    handful of array operations over all buildings and buckets at once.
+
+    Args:
+        location_counts: (n_locations, n_buckets) participant counts
+        building_counts: (n_buildings, n_buckets) participant counts
+        campus_counts: (1, n_buckets) participant counts
+        location_building: Building code of each location
+        min_n: Minimum participants per published cell
+
+    Returns:
+        Dict of boolean masks keyed by level, True where suppressed
+    """
+    location_building = np.asarray(location_building, dtype=np.int64)
+    n_buildings = len(building_counts)
+    masks = {
+        'location': location_counts < min_n,
+        'building': building_counts < min_n,
+        'campus': campus_counts < min_n,
+    }
+    campus_groups = np.zeros(n_buildings, dtype=np.int64)
+    changed = True
+    while changed:
+        changed = _complement_relation(masks['location'], masks['building'], location_counts,
+                                       building_counts, location_building, n_buildings)
+        changed |= _complement_relation(masks['building'], masks['campus'], building_counts,
+                                        campus_counts, campus_groups, 1)
+    return masks
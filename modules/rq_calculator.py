@@ -3,10 +3,28 @@ Resilience Quotient™ (RQ) Calculator Engine
 Scientific instrument for measuring adaptive capacity to stress.
 Calculates RQ from four domains: Recovery Speed, Consistency, Adaptability, Load Tolerance.
 """
+import hashlib
 import numpy as np
 from datetime import datetime, timedelta
 import random
 
+from .utils import PercentileIndex
+from .rq_history import recovery_category
+
+# Batch inputs and defaults (midpoints of the ranges simulated when absent)
+BATCH_INPUTS = {
+    'recovery_minutes': None,
+    'hrv_variance': 12.5,
+    'sentiment_variance': 20.0,
+    'task_variance': 15.0,
+    'improvement_pct': 3.0,
+    'event_count': 35.0,
+    'drift_score': 7.5
+}
+DEFAULT_RECOVERY_MINUTES = 5.5
+DEGRADATION_THRESHOLDS = np.array([5, 10])
+DEGRADATION_LABELS = np.array(["minimal", "moderate", "significant"])
+
 class RQCalculator:
     """
     Core calculation engine for Resilience Quotient™.
@@ -18,7 +36,7 @@ class RQCalculator:
     - Tolerance to cumulative load
     """
     
-    def __init__(self):
+    def __init__(self, reference_index=None, history_store=None):
         # Initial weights (will be personalized weekly)
         self.weights = {
             'recovery_speed': 0.30,
@@ -27,6 +45,12 @@ class RQCalculator:
             'load_tolerance': 0.20
         }
         
+        # Reference population of recovery-speed scores for percentile ranking
+        self.reference_index = reference_index
+        
+        # Optional RQHistoryStore; trend and stress-profile views read from it
+        self.history_store = history_store
+        
         # Descriptor thresholds
         self.descriptors = [
             (0, 35, "Vulnerable"),
@@ -70,8 +94,11 @@ class RQCalculator:
         # Assuming 3 min = 100, 10 min = 0
         score = max(0, min(100, int(100 - ((avg_recovery_minutes - 3) / 7) * 100)))
         
-        # Calculate percentile (simulated)
-        percentile = min(99, max(1, int(score * 0.9 + random.uniform(-5, 5))))
+        # Percentile against the reference population (if one is loaded)
+        if self.reference_index is not None and len(self.reference_index):
+            percentile = min(99, max(1, self.reference_index.percentile(score)))
+        else:
+            percentile = min(99, max(1, int(score * 0.9)))
         
         return {
             'value': avg_recovery_str,
@@ -80,6 +107,10 @@ class RQCalculator:
             'raw_minutes': avg_recovery_minutes
         }
     
+    def set_reference_population(self, recovery_speed_scores):
+        """Builds the percentile index used by calculate_recovery_speed (once per population)."""
+        self.reference_index = PercentileIndex(recovery_speed_scores)
+    
     def calculate_consistency(self, hrv_variance=None, sentiment_variance=None, task_variance=None):
         """
         DOMAIN 2: Consistency (C)
@@ -243,6 +274,122 @@ class RQCalculator:
             'timestamp': datetime.now().isoformat()
         }
     
+    def record_result(self, user_id, result, timestamp=None):
+        """
+        Append a calculate_rq result to the history store.
+        
+        The dominant domain is the one contributing most to the weighted
+        composite.
+        """
+        if self.history_store is None:
+            return
+        d = result['domains']
+        contributions = {
+            'Recovery Speed': d['recovery_speed']['score'] * self.weights['recovery_speed'],
+            'Consistency': d['consistency']['value'] * self.weights['consistency'],
+            'Adaptability': max(0, min(100, 50 + d['adaptability']['value'] * 5)) * self.weights['adaptability'],
+            'Load Tolerance': max(0, min(100, (d['load_tolerance']['value'] / 50) * 100)) * self.weights['load_tolerance']
+        }
+        self.history_store.record_rq(
+            user_id,
+            timestamp or datetime.fromisoformat(result['timestamp']),
+            result['rq_score'],
+            dominant_domain=max(contributions, key=contributions.get),
+            confidence=result['confidence']
+        )
+    
+    def record_stress_events(self, user_id, events, timestamp=None):
+        """
+        Append stress events ({stress_intensity, recovery_duration}, as
+        returned by generate_stress_response_data) to the history store.
+        """
+        if self.history_store is None:
+            return
+        timestamp = timestamp or datetime.now()
+        for event in events:
+            self.history_store.record_stress_event(
+                user_id, timestamp, event['stress_intensity'], event['recovery_duration'])
+    
+    def calculate_rq_batch(self, data=None, **columns):
+        """
+        Vectorized RQ for a whole cohort in one NumPy pass.
+        
+        Same scoring rules as calculate_rq and its domain methods, applied to
+        aligned per-user arrays instead of one user per call.
+        
+        Args:
+            data: DataFrame or dict of arrays with any of BATCH_INPUTS columns;
+                keyword arrays are merged over it. Only 'recovery_minutes' is
+                required; other missing columns use the midpoint of the range
+                calculate_rq simulates when that input is absent.
+        
+        Returns:
+            dict of arrays, one entry per user: 'rq_score', 'descriptor',
+            'recovery_speed_score', 'consistency', 'adaptability',
+            'adaptability_score', 'load_tolerance_score', 'degradation'
+        """
+        source = {}
+        if data is not None:
+            source.update({key: data[key] for key in BATCH_INPUTS if key in data})
+        source.update(columns)
+        if 'recovery_minutes' not in source:
+            raise ValueError("calculate_rq_batch requires 'recovery_minutes'")
+        
+        recovery = np.asarray(source['recovery_minutes'], dtype=np.float64)
+        n = len(recovery)
+        col = {
+            key: np.broadcast_to(np.asarray(source.get(key, default), dtype=np.float64), (n,))
+            for key, default in BATCH_INPUTS.items() if key != 'recovery_minutes'
+        }
+        
+        # Domain 1: 3 min = 100, 10 min = 0 (int() truncation as in the scalar path)
+        rs_score = np.clip(np.trunc(100 - ((recovery - 3) / 7) * 100), 0, 100)
+        # Domain 2: inverse of mean variance
+        avg_variance = (col['hrv_variance'] + col['sentiment_variance'] + col['task_variance']) / 3
+        consistency = np.clip(np.trunc(100 - (avg_variance / 30) * 100), 0, 100)
+        # Domain 3: +10% improvement = 100 score
+        adaptability = np.trunc(col['improvement_pct'])
+        a_score = np.clip(50 + adaptability * 5, 0, 100)
+        # Domain 4: 50 events = 100 score
+        lt_score = np.clip((col['event_count'] / 50) * 100, 0, 100)
+        
+        rq_score = np.trunc(
+            rs_score * self.weights['recovery_speed'] +
+            consistency * self.weights['consistency'] +
+            a_score * self.weights['adaptability'] +
+            lt_score * self.weights['load_tolerance']
+        ).astype(np.int64)
+        
+        return {
+            'rq_score': rq_score,
+            'descriptor': self.get_descriptor_batch(rq_score),
+            'recovery_speed_score': rs_score.astype(np.int64),
+            'consistency': consistency.astype(np.int64),
+            'adaptability': adaptability.astype(np.int64),
+            'adaptability_score': a_score,
+            'load_tolerance_score': lt_score,
+            'degradation': DEGRADATION_LABELS[np.searchsorted(DEGRADATION_THRESHOLDS, col['drift_score'], side='right')]
+        }
+    
+    def calculate_rq_from_state(self, states):
+        """
+        RQ from persisted per-domain aggregates (one RQState or a list).
+        Costs O(users), independent of how long anyone has been enrolled.
+        """
+        states = [states] if isinstance(states, RQState) else list(states)
+        inputs = [state.domain_inputs() for state in states]
+        columns = {key: np.array([row[key] for row in inputs]) for key in BATCH_INPUTS}
+        return self.calculate_rq_batch(columns)
+    
+    def get_descriptor_batch(self, rq_scores):
+        """Vectorized get_descriptor for integer RQ scores."""
+        rq_scores = np.asarray(rq_scores)
+        upper = np.array([max_val for _, max_val, _ in self.descriptors])
+        labels = np.array([label for _, _, label in self.descriptors] + ["Unknown"])
+        tier = np.searchsorted(upper, rq_scores, side='left')
+        tier = np.where(rq_scores < self.descriptors[0][0], len(self.descriptors), tier)
+        return labels[tier]
+    
     def get_descriptor(self, rq_score):
         """Get descriptor label for RQ score."""
         for min_val, max_val, label in self.descriptors:
@@ -255,23 +402,36 @@ class RQCalculator:
         Update personalized weights based on user history.
         Called weekly to adapt to individual patterns.
         
-        In production, this would use ML to optimize weights.
-        For now, we'll keep default weights.
+        Fits non-negative weights summing to 1 so the weighted domain scores
+        best predict the observed outcome (see fit_personalized_weights).
+        
+        Args:
+            user_history: DataFrame or list of dicts with DOMAIN_KEYS columns
+                and an 'outcome' column (0-100)
         """
-        # Placeholder for weekly weight adaptation
-        # In production: analyze which domains are most predictive for this user
-        pass
+        fitted = fit_personalized_weights({'user': user_history}, prior=self.weights)
+        self.weights = fitted['user']
+        return self.weights.copy()
     
-    def generate_trend_data(self, days=14):
+    def generate_trend_data(self, days=14, user_id=None):
         """
         Generate RQ trend data for visualization.
         
+        Reads daily rollups from the history store when the user has at
+        least two recorded days in the window; otherwise simulates a demo trend.
+        
         Args:
             days (int): Number of days to generate
+            user_id (str): User whose history to read
         
         Returns:
             list: List of {date, rq_score, dominant_domain, confidence}
         """
+        if self.history_store is not None:
+            recorded = self.history_store.trend_data(user_id, days)
+            if len(recorded) > 1:  # A single day is not a trend
+                return recorded
+        
         trend_data = []
         base_rq = random.randint(50, 70)
         
@@ -300,16 +460,26 @@ class RQCalculator:
         
         return trend_data
     
-    def generate_stress_response_data(self, num_events=50):
+    def generate_stress_response_data(self, num_events=50, user_id=None, days=None):
         """
         Generate stress response profile data for scatter plot.
         
+        Returns the user's most recent recorded stress events when the
+        history store has any; otherwise simulates demo events.
+        
         Args:
             num_events (int): Number of stress events to generate
+            user_id (str): User whose history to read
+            days (int): Only read events from the last `days` days
         
         Returns:
             list: List of {stress_intensity, recovery_duration, category}
         """
+        if self.history_store is not None and user_id is not None:
+            recorded = self.history_store.stress_response_data(user_id, num_events, days)
+            if recorded:
+                return recorded
+        
         events = []
         
         for _ in range(num_events):
@@ -321,27 +491,174 @@ class RQCalculator:
             recovery = base_recovery + random.uniform(-2, 2)
             recovery = max(1, recovery)
             
-            # Categorize by recovery speed
-            if recovery < 5:
-                category = "Fast (< 5min)"
-            elif recovery < 10:
-                category = "Moderate (5-10min)"
-            else:
-                category = "Slow (> 10min)"
-            
             events.append({
                 'stress_intensity': intensity,
                 'recovery_duration': recovery,
-                'category': category
+                'category': recovery_category(recovery)
             })
         
         return events
 
+class _Welford:
+    """Running mean/variance (Welford), mergeable and serializable."""
+    
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n, self.mean, self.m2 = n, mean, m2
+    
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+    
+    def variance(self, default):
+        return float(self.m2 / (self.n - 1)) if self.n > 1 else default
+    
+    def to_list(self):
+        return [self.n, self.mean, self.m2]
+
+
+class RQState:
+    """
+    Persisted per-domain aggregates for incremental daily RQ.
+    
+    update_day() folds in only the new day's data:
+    - Recovery Speed: sum and count of recovery times
+    - Consistency: Welford day-to-day variance of HRV, sentiment and task scores
+    - Adaptability: least-squares slope accumulators of daily mean recovery time
+    - Load Tolerance: stress events over the last 30 days (ring buffer keyed
+      by day index, so gaps, late days and repeat updates stay exact) and
+      baseline HRV drift (slow EWMA baseline vs. fast EWMA recent level)
+    """
+    
+    LOAD_WINDOW_DAYS = 30
+    BASELINE_ALPHA = 0.05
+    RECENT_ALPHA = 0.3
+    
+    def __init__(self):
+        self.recovery_sum = 0.0
+        self.recovery_count = 0
+        self.hrv = _Welford()
+        self.sentiment = _Welford()
+        self.task = _Welford()
+        # Slope accumulators over (day_index, daily mean recovery time)
+        self.slope_n = 0
+        self.slope_sx = self.slope_sy = self.slope_sxy = self.slope_sxx = 0.0
+        # Stress event counts per day index; slot day % LOAD_WINDOW_DAYS holds
+        # the most recent day mapped to it (None = empty)
+        self.event_days = [None] * self.LOAD_WINDOW_DAYS
+        self.event_counts = [0] * self.LOAD_WINDOW_DAYS
+        self.hrv_baseline = None
+        self.hrv_recent = None
+        self.days = 0
+    
+    def update_day(self, recovery_times=None, daily_hrv=None, sentiment=None,
+                   task_score=None, stress_events=0, day_index=None):
+        """
+        Folds one day of data into the aggregates in O(new data).
+        
+        Args:
+            recovery_times: Recovery times (minutes) of the day's stress events
+            daily_hrv, sentiment, task_score: The day's summary values
+            stress_events: Number of stress events that day
+            day_index: Day number for the adaptability slope (default: next day)
+        """
+        day = self.days if day_index is None else day_index
+        if recovery_times is not None and len(recovery_times):
+            times = np.asarray(recovery_times, dtype=np.float64)
+            self.recovery_sum += float(times.sum())
+            self.recovery_count += len(times)
+            daily_mean = float(times.mean())
+            self.slope_n += 1
+            self.slope_sx += day
+            self.slope_sy += daily_mean
+            self.slope_sxy += day * daily_mean
+            self.slope_sxx += day * day
+        for welford, value in ((self.hrv, daily_hrv), (self.sentiment, sentiment), (self.task, task_score)):
+            if value is not None:
+                welford.add(float(value))
+        if daily_hrv is not None:
+            if self.hrv_baseline is None:
+                self.hrv_baseline = self.hrv_recent = float(daily_hrv)
+            else:
+                self.hrv_baseline += self.BASELINE_ALPHA * (daily_hrv - self.hrv_baseline)
+                self.hrv_recent += self.RECENT_ALPHA * (daily_hrv - self.hrv_recent)
+        self.days = max(self.days, day + 1)
+        self._add_events(day, int(stress_events))
+    
+    def _add_events(self, day, count):
+        """Adds a day's stress events; days older than the window are dropped."""
+        if day <= self.days - 1 - self.LOAD_WINDOW_DAYS:
+            return
+        slot = day % self.LOAD_WINDOW_DAYS
+        if self.event_days[slot] != day:
+            # The slot held a day at least one window older: reuse it
+            self.event_days[slot] = day
+            self.event_counts[slot] = 0
+        self.event_counts[slot] += count
+    
+    @property
+    def window_events(self):
+        """Stress events over the LOAD_WINDOW_DAYS days ending on the latest day."""
+        oldest = self.days - self.LOAD_WINDOW_DAYS
+        return sum(count for day, count in zip(self.event_days, self.event_counts)
+                   if day is not None and day >= oldest)
+    
+    def domain_inputs(self):
+        """Current inputs for RQCalculator.calculate_rq_batch (BATCH_INPUTS keys)."""
+        mean_recovery = self.recovery_sum / self.recovery_count if self.recovery_count else DEFAULT_RECOVERY_MINUTES
+        improvement = BATCH_INPUTS['improvement_pct']
+        denom = self.slope_n * self.slope_sxx - self.slope_sx ** 2
+        if self.slope_n > 1 and denom > 0 and mean_recovery > 0:
+            slope = (self.slope_n * self.slope_sxy - self.slope_sx * self.slope_sy) / denom
+            # Percent reduction in recovery time over 30 days
+            improvement = -slope * 30 / mean_recovery * 100
+        drift = BATCH_INPUTS['drift_score']
+        if self.hrv_baseline is not None:
+            drift = max(0.0, self.hrv_baseline - self.hrv_recent)
+        return {
+            'recovery_minutes': mean_recovery,
+            'hrv_variance': self.hrv.variance(BATCH_INPUTS['hrv_variance']),
+            'sentiment_variance': self.sentiment.variance(BATCH_INPUTS['sentiment_variance']),
+            'task_variance': self.task.variance(BATCH_INPUTS['task_variance']),
+            'improvement_pct': improvement,
+            'event_count': self.window_events if self.days else BATCH_INPUTS['event_count'],
+            'drift_score': drift
+        }
+    
+    def to_dict(self):
+        return {
+            'recovery': [self.recovery_sum, self.recovery_count],
+            'hrv': self.hrv.to_list(),
+            'sentiment': self.sentiment.to_list(),
+            'task': self.task.to_list(),
+            'slope': [self.slope_n, self.slope_sx, self.slope_sy, self.slope_sxy, self.slope_sxx],
+            'daily_events': [[day, count] for day, count in zip(self.event_days, self.event_counts)
+                             if day is not None and day >= self.days - self.LOAD_WINDOW_DAYS],
+            'hrv_ewma': [self.hrv_baseline, self.hrv_recent],
+            'days': self.days
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.recovery_sum, state.recovery_count = data['recovery']
+        state.hrv = _Welford(*data['hrv'])
+        state.sentiment = _Welford(*data['sentiment'])
+        state.task = _Welford(*data['task'])
+        state.slope_n, state.slope_sx, state.slope_sy, state.slope_sxy, state.slope_sxx = data['slope']
+        state.hrv_baseline, state.hrv_recent = data['hrv_ewma']
+        state.days = data['days']
+        for day, count in data['daily_events']:
+            state._add_events(day, count)
+        return state
+
 # Legacy compatibility
+_default_calculator = RQCalculator()
+
 def calculate_score(history):
     """Legacy function for backward compatibility."""
-    calc = RQCalculator()
-    result = calc.calculate_rq()
+    result = _default_calculator.calculate_rq()
     return {
         'overall': result['rq_score'],
         'resistance': result['domains']['load_tolerance']['value'],
@@ -351,5 +668,119 @@ def calculate_score(history):
 
 def get_tier(score):
     """Legacy function for backward compatibility."""
-    calc = RQCalculator()
-    return calc.get_descriptor(score)
+    return _default_calculator.get_descriptor(score)
+
+
+# --- Personalized weight fitting ---
+
+DOMAIN_KEYS = ['recovery_speed', 'consistency', 'adaptability', 'load_tolerance']
+WEIGHT_PRIOR_STRENGTH = 0.005  # Ridge pull toward the prior weights (scores scaled to 0-1)
+
+
+def _project_to_simplex(v):
+    """Euclidean projection of each row of v onto {w >= 0, sum(w) = 1}."""
+    u = -np.sort(-v, axis=1)
+    css = np.cumsum(u, axis=1) - 1
+    idx = np.arange(1, v.shape[1] + 1)
+    rho = np.count_nonzero(u - css / idx > 0, axis=1)
+    theta = css[np.arange(len(v)), rho - 1] / rho
+    return np.maximum(v - theta[:, None], 0)
+
+
+def solve_simplex_weights(X, y, mask, prior, ridge=WEIGHT_PRIOR_STRENGTH, iterations=300):
+    """
+    Batched constrained least squares for all users at once:
+        min_w ||X_u w - y_u||² / n_u + ridge·||w - prior||²  s.t. w >= 0, sum(w) = 1
+    solved by accelerated projected gradient on per-user 4×4 Gram matrices.
+    
+    Args:
+        X: (users, days, 4) domain scores scaled to 0-1
+        y: (users, days) outcomes scaled to 0-1
+        mask: (users, days) valid-day mask
+        prior: (4,) prior weights
+    
+    Returns:
+        (users, 4) weights
+    """
+    w_mask = mask.astype(np.float64)
+    n = np.maximum(w_mask.sum(axis=1), 1.0)[:, None, None]
+    gram = np.einsum('ud,udi,udj->uij', w_mask, X, X) / n + ridge * np.eye(X.shape[2])
+    rhs = np.einsum('ud,udi,ud->ui', w_mask, X, y) / n[:, :, 0] + ridge * prior
+    step = 1.0 / np.linalg.eigvalsh(gram)[:, -1:]
+    
+    # Accelerated projected gradient (FISTA)
+    w = np.broadcast_to(prior, rhs.shape).copy()
+    z, t = w.copy(), 1.0
+    for _ in range(iterations):
+        gradient = np.einsum('uij,uj->ui', gram, z) - rhs
+        w_next = _project_to_simplex(z - step * gradient)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        z = w_next + ((t - 1) / t_next) * (w_next - w)
+        w, t = w_next, t_next
+    return w
+
+
+def _history_table(history) -> np.ndarray:
+    """(days, 5) float array of DOMAIN_KEYS + outcome from a DataFrame or list of dicts."""
+    columns = DOMAIN_KEYS + ['outcome']
+    if hasattr(history, 'to_numpy'):
+        return history[columns].to_numpy(dtype=np.float64)
+    return np.array([[row[k] for k in columns] for row in history], dtype=np.float64).reshape(-1, len(columns))
+
+
+def history_fingerprint(table: np.ndarray) -> str:
+    """SHA-256 of a user's history table, to skip refits when nothing changed."""
+    return hashlib.sha256(np.ascontiguousarray(table).tobytes()).hexdigest()
+
+
+def fit_personalized_weights(histories, prior=None, cache=None):
+    """
+    Nightly job: fits personalized RQ weights for every user in one batched solve.
+    
+    Args:
+        histories: user_id -> DataFrame / list of dicts with DOMAIN_KEYS + 'outcome',
+            or one long DataFrame with a 'user_id' column (fastest for the whole
+            user base: split into per-user views without per-user pandas calls)
+        prior: Prior weight dict (default: RQCalculator default weights)
+        cache: Optional dict user_id -> {'fingerprint', 'weights'}, updated in
+            place; users whose history fingerprint is unchanged are not refit
+    
+    Returns:
+        user_id -> weights dict
+    """
+    prior = prior or RQCalculator().weights
+    prior_vec = np.array([prior[k] for k in DOMAIN_KEYS])
+    results, stale = {}, []
+    if hasattr(histories, 'columns') and 'user_id' in histories.columns:
+        ordered = histories.sort_values('user_id', kind='stable')
+        user_ids, starts = np.unique(ordered['user_id'].to_numpy(), return_index=True)
+        tables = np.split(_history_table(ordered), starts[1:])
+        items = zip(user_ids.tolist(), tables)
+    else:
+        items = ((uid, _history_table(history)) for uid, history in histories.items())
+    
+    for uid, table in items:
+        fingerprint = history_fingerprint(table)
+        entry = cache.get(uid) if cache is not None else None
+        if entry and entry['fingerprint'] == fingerprint:
+            results[uid] = entry['weights']
+        else:
+            stale.append((uid, fingerprint, table))
+    if not stale:
+        return results
+    
+    width = max(1, max(len(table) for _, _, table in stale))
+    data = np.zeros((len(stale), width, 5))
+    mask = np.zeros((len(stale), width), dtype=bool)
+    for i, (_, _, table) in enumerate(stale):
+        data[i, :len(table)] = table
+        mask[i, :len(table)] = True
+    data /= 100.0
+    
+    weights = solve_simplex_weights(data[:, :, :4], data[:, :, 4], mask, prior_vec)
+    for (uid, fingerprint, _), w in zip(stale, weights):
+        fitted = {k: round(float(v), 4) for k, v in zip(DOMAIN_KEYS, w)}
+        results[uid] = fitted
+        if cache is not None:
+            cache[uid] = {'fingerprint': fingerprint, 'weights': fitted}
+    return results
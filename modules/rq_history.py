@@ -0,0 +1,203 @@
+"""
+RQ History Store
+Per-user, time-indexed storage of RQ scores and stress events with
+precomputed daily rollups. Range queries use binary search over sorted
+timestamp arrays (O(log n + k)), so trend charts and PDF reports read
+real history instead of recomputing or simulating it.
+"""
+import numpy as np
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+DOMAIN_LABELS = ['Recovery Speed', 'Consistency', 'Adaptability', 'Load Tolerance']
+
+
+def recovery_category(recovery_minutes: float) -> str:
+    """Recovery speed bucket used by the Stress Response Profile chart."""
+    if recovery_minutes < 5:
+        return "Fast (< 5min)"
+    elif recovery_minutes < 10:
+        return "Moderate (5-10min)"
+    return "Slow (> 10min)"
+
+
+def _to_epoch(timestamp) -> int:
+    if isinstance(timestamp, datetime):
+        return int(timestamp.timestamp())
+    if isinstance(timestamp, date):
+        return int(datetime(timestamp.year, timestamp.month, timestamp.day).timestamp())
+    return int(timestamp)
+
+
+def _local_day(epoch: int) -> int:
+    """Local calendar day number (days since 1970-01-01 local time)."""
+    return datetime.fromtimestamp(epoch).date().toordinal() - date(1970, 1, 1).toordinal()
+
+
+class _SortedSeries:
+    """
+    Growable columnar arrays sorted by an int64 key.
+    In-order appends are amortized O(1); late records are inserted in place.
+    """
+
+    def __init__(self, columns: Dict[str, type]):
+        self.size = 0
+        self.keys = np.empty(16, dtype=np.int64)
+        self.columns = {name: np.empty(16, dtype=dtype) for name, dtype in columns.items()}
+
+    def _grow(self):
+        capacity = len(self.keys) * 2
+        self.keys = np.resize(self.keys, capacity)
+        for name, array in self.columns.items():
+            self.columns[name] = np.resize(array, capacity)
+
+    def insert(self, key: int, **values) -> int:
+        """Inserts a row and returns its position."""
+        if self.size == len(self.keys):
+            self._grow()
+        if self.size == 0 or key >= self.keys[self.size - 1]:
+            pos = self.size
+        else:
+            pos = int(np.searchsorted(self.keys[:self.size], key, side='right'))
+            self.keys[pos + 1:self.size + 1] = self.keys[pos:self.size]
+            for array in self.columns.values():
+                array[pos + 1:self.size + 1] = array[pos:self.size]
+        self.keys[pos] = key
+        for name, value in values.items():
+            self.columns[name][pos] = value
+        self.size += 1
+        return pos
+
+    def find(self, key: int) -> Optional[int]:
+        pos = int(np.searchsorted(self.keys[:self.size], key, side='left'))
+        return pos if pos < self.size and self.keys[pos] == key else None
+
+    def slice(self, start_key: Optional[int] = None, end_key: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Rows with start_key <= key < end_key (views, O(log n))."""
+        keys = self.keys[:self.size]
+        lo = 0 if start_key is None else int(np.searchsorted(keys, start_key, side='left'))
+        hi = self.size if end_key is None else int(np.searchsorted(keys, end_key, side='left'))
+        result = {name: array[lo:hi] for name, array in self.columns.items()}
+        result['key'] = keys[lo:hi]
+        return result
+
+
+class RQHistoryStore:
+    """
+    In-memory per-user RQ and stress-event history.
+
+    Every RQ record also updates that day's rollup (count, sum, min, max,
+    confidence sum, last dominant domain), so daily views never rescan
+    the raw records.
+    """
+
+    def __init__(self):
+        self.rq: Dict[str, _SortedSeries] = {}
+        self.daily: Dict[str, _SortedSeries] = {}
+        self.events: Dict[str, _SortedSeries] = {}
+
+    def record_rq(self, user_id: str, timestamp, rq_score: float,
+                  dominant_domain: Optional[str] = None, confidence: float = np.nan):
+        """Stores one RQ score and folds it into the day's rollup."""
+        epoch = _to_epoch(timestamp)
+        domain_code = DOMAIN_LABELS.index(dominant_domain) if dominant_domain in DOMAIN_LABELS else -1
+        series = self.rq.setdefault(user_id, _SortedSeries(
+            {'rq_score': np.float64, 'domain': np.int8, 'confidence': np.float64}))
+        series.insert(epoch, rq_score=rq_score, domain=domain_code, confidence=confidence)
+
+        daily = self.daily.setdefault(user_id, _SortedSeries({
+            'count': np.int64, 'sum': np.float64, 'min': np.float64, 'max': np.float64,
+            'confidence_sum': np.float64, 'confidence_count': np.int64, 'domain': np.int8}))
+        day = _local_day(epoch)
+        pos = daily.find(day)
+        has_confidence = not np.isnan(confidence)
+        if pos is None:
+            daily.insert(day, count=1, sum=rq_score, min=rq_score, max=rq_score,
+                         confidence_sum=confidence if has_confidence else 0.0,
+                         confidence_count=int(has_confidence), domain=domain_code)
+        else:
+            cols = daily.columns
+            cols['count'][pos] += 1
+            cols['sum'][pos] += rq_score
+            cols['min'][pos] = min(cols['min'][pos], rq_score)
+            cols['max'][pos] = max(cols['max'][pos], rq_score)
+            if has_confidence:
+                cols['confidence_sum'][pos] += confidence
+                cols['confidence_count'][pos] += 1
+            if domain_code >= 0:
+                cols['domain'][pos] = domain_code
+
+    def record_stress_event(self, user_id: str, timestamp, intensity: float, recovery_duration: float):
+        """Stores one stress event (intensity 0-100, recovery in minutes)."""
+        series = self.events.setdefault(user_id, _SortedSeries(
+            {'intensity': np.float64, 'recovery_duration': np.float64}))
+        series.insert(_to_epoch(timestamp), intensity=intensity, recovery_duration=recovery_duration)
+
+    def has_history(self, user_id: str) -> bool:
+        return user_id in self.rq and self.rq[user_id].size > 0
+
+    def rq_range(self, user_id: str, start=None, end=None) -> Dict[str, np.ndarray]:
+        """Raw RQ records with start <= timestamp < end."""
+        series = self.rq.get(user_id)
+        if series is None:
+            return {'key': np.empty(0, dtype=np.int64), 'rq_score': np.empty(0)}
+        return series.slice(None if start is None else _to_epoch(start), None if end is None else _to_epoch(end))
+
+    def daily_rollups(self, user_id: str, start_day: Optional[date] = None,
+                      end_day: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """Daily rollups for start_day <= day < end_day, with 'date' and 'mean' added."""
+        series = self.daily.get(user_id)
+        if series is None:
+            return {'date': [], 'mean': np.empty(0), 'count': np.empty(0, dtype=np.int64)}
+        epoch_day = date(1970, 1, 1).toordinal()
+        rows = series.slice(None if start_day is None else start_day.toordinal() - epoch_day,
+                            None if end_day is None else end_day.toordinal() - epoch_day)
+        rows['mean'] = rows['sum'] / rows['count']
+        rows['date'] = [date.fromordinal(int(k) + epoch_day) for k in rows['key']]
+        return rows
+
+    def last_n_days(self, user_id: str, days: int, today: Optional[date] = None) -> Dict[str, np.ndarray]:
+        today = today or date.today()
+        return self.daily_rollups(user_id, today - timedelta(days=days - 1), today + timedelta(days=1))
+
+    def trend_data(self, user_id: str, days: int = 14) -> List[Dict]:
+        """Daily RQ trend in the RQCalculator.generate_trend_data format."""
+        rows = self.last_n_days(user_id, days)
+        confidence = np.divide(rows.get('confidence_sum', []), rows.get('confidence_count', []),
+                               out=np.full(len(rows['date']), np.nan),
+                               where=np.asarray(rows.get('confidence_count', [])) > 0)
+        return [
+            {
+                'date': day.strftime('%b %d'),
+                'rq_score': int(mean),
+                'dominant_domain': DOMAIN_LABELS[code] if code >= 0 else None,
+                'confidence': float(conf)
+            }
+            for day, mean, code, conf in zip(rows['date'], rows['mean'], rows.get('domain', []), confidence)
+        ]
+
+    def stress_range(self, user_id: str, start=None, end=None) -> Dict[str, np.ndarray]:
+        """Raw stress events with start <= timestamp < end."""
+        series = self.events.get(user_id)
+        if series is None:
+            return {'key': np.empty(0, dtype=np.int64), 'intensity': np.empty(0),
+                    'recovery_duration': np.empty(0)}
+        return series.slice(None if start is None else _to_epoch(start), None if end is None else _to_epoch(end))
+
+    def stress_response_data(self, user_id: str, num_events: int = 50, days: Optional[int] = None) -> List[Dict]:
+        """
+        Most recent stress events (optionally only those of the last `days`
+        days) in the generate_stress_response_data format.
+        """
+        start = datetime.now() - timedelta(days=days) if days is not None else None
+        rows = self.stress_range(user_id, start)
+        intensity = rows['intensity'][-num_events:] if num_events > 0 else rows['intensity'][:0]
+        recovery = rows['recovery_duration'][-num_events:] if num_events > 0 else rows['recovery_duration'][:0]
+        return [
+            {
+                'stress_intensity': float(i),
+                'recovery_duration': float(r),
+                'category': recovery_category(r)
+            }
+            for i, r in zip(intensity, recovery)
+        ]
@@ -2,8 +2,15 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
-import pickle
+import copy
+import itertools
 import os
+import time
+
+from .model_registry import MODEL_REGISTRY, save_model_file
+from .tree_ensemble import CompactForest
+from .hrv_features import rmssd
+from . import sri_engine
 
 # ==========================================
 # SYMBIOME SCIENCE LOGIC & AI ENGINE
@@ -22,12 +29,11 @@ def calculate_rmssd(rr_intervals):
     This is the gold-standard time-domain measure for HRV.
     
     Formula: sqrt(mean(diff(RR)^2))
+    
+    Windowed RMSSD, SDNN, pNN50, LF/HF and SD1/SD2 over long RR streams
+    live in modules.hrv_features.
     """
-    diffs = np.diff(rr_intervals)
-    squared_diffs = diffs ** 2
-    mean_squared_diff = np.mean(squared_diffs)
-    rmssd = np.sqrt(mean_squared_diff)
-    return rmssd
+    return rmssd(rr_intervals)
 
 def calculate_sri(hrv, gsr, facial):
     """
@@ -38,13 +44,38 @@ def calculate_sri(hrv, gsr, facial):
     - HRV: 50% (Most reliable indicator of vagal tone)
     - GSR: 30% (Acute stress response)
     - Facial: 20% (Behavioral/Emotional proxy)
+    
+    Accepts scalars or arrays; see modules.sri_engine ('science' profile).
     """
-    sri = (hrv * 0.5) + (gsr * 0.3) + (facial * 0.2)
-    return sri
+    return sri_engine.calculate_sri(hrv, gsr, facial, profile='science')
 
 # --- 2. AI Model Engine ---
 
 MODEL_PATH = "symbiome/data/recovery_model.pkl"
+MODEL_NAME = "recovery_time"
+MODEL_VERSION = 1
+# Flat-array exports of the forest, one subdirectory per source pickle hash
+COMPACT_MODEL_DIR = "symbiome/data/recovery_model_compact"
+FEATURE_COLUMNS = ['Baseline_HRV', 'Stress_Peak_GSR', 'Sleep_Hours', 'Caffeine_Intake']
+
+def recovery_time_formula(hrv, gsr_peak, sleep, caffeine):
+    """
+    The "Ground Truth" Formula (Simulation of Physiology).
+    Used to label synthetic training data and as the fallback estimate
+    while the model is being trained in the background.
+    
+    More Sleep = Faster Recovery
+    Higher HRV = Faster Recovery
+    Higher Stress Peak = Slower Recovery
+    Caffeine = Slower Recovery
+    """
+    return (
+        10 
+        - (hrv * 0.05) 
+        + (gsr_peak * 0.5) 
+        - (sleep * 0.8) 
+        + (caffeine * 1.2)
+    )
 
 def train_recovery_model():
     """
@@ -71,49 +102,268 @@ def train_recovery_model():
     
     df = pd.DataFrame(data)
     
-    # The "Ground Truth" Formula (Simulation of Physiology)
-    # More Sleep = Faster Recovery
-    # Higher HRV = Faster Recovery
-    # Higher Stress Peak = Slower Recovery
-    # Caffeine = Slower Recovery
-    df['Recovery_Time_Min'] = (
-        10 
-        - (df['Baseline_HRV'] * 0.05) 
-        + (df['Stress_Peak_GSR'] * 0.5) 
-        - (df['Sleep_Hours'] * 0.8) 
-        + (df['Caffeine_Intake'] * 1.2)
+    df['Recovery_Time_Min'] = recovery_time_formula(
+        df['Baseline_HRV'], df['Stress_Peak_GSR'], df['Sleep_Hours'], df['Caffeine_Intake']
     )
     # Add some noise
     df['Recovery_Time_Min'] += np.random.normal(0, 1, n_samples)
     df['Recovery_Time_Min'] = df['Recovery_Time_Min'].clip(1, 30)
     
     # Train Model
-    X = df[['Baseline_HRV', 'Stress_Peak_GSR', 'Sleep_Hours', 'Caffeine_Intake']]
+    X = df[FEATURE_COLUMNS]
     y = df['Recovery_Time_Min']
     
     model = RandomForestRegressor(n_estimators=100, random_state=42)
     model.fit(X, y)
     
-    # Save Model
-    with open(MODEL_PATH, 'wb') as f:
-        pickle.dump(model, f)
+    # Save Model (atomic write + hash/version sidecar for the registry)
+    save_model_file(MODEL_PATH, model, MODEL_VERSION)
         
     print(f"AI Model trained and saved to {MODEL_PATH}")
     return model
 
+MODEL_REGISTRY.register(MODEL_NAME, MODEL_PATH, train_recovery_model, MODEL_VERSION)
+
+# --- Retraining from recorded sessions ---
+
+LABEL_COLUMN = 'Recovery_Time_Min'
+# Session dict keys (see utils.DataModels.create_session_data) for each feature
+SESSION_FIELDS = {
+    'Baseline_HRV': 'hrv',
+    'Stress_Peak_GSR': 'gsr_peak',
+    'Sleep_Hours': 'sleep_hours',
+    'Caffeine_Intake': 'caffeine',
+}
+# Context features sessions often lack are imputed with population defaults
+EPISODE_DEFAULTS = {'Sleep_Hours': 7.0, 'Caffeine_Intake': 0.0}
+# Caps that keep fit time and forest size bounded for large histories
+MAX_TRAINING_ROWS = 200_000
+MAX_LEAVES_PER_TREE = 20_000
+
+def extract_recovery_episodes(sessions):
+    """
+    Builds labelled recovery episodes from stored sessions.
+    
+    Args:
+        sessions: List of session dicts (as produced by DataModels.create_session_data
+            or CloudStorage.download_sessions) or a DataFrame of them. A DataFrame that
+            already has FEATURE_COLUMNS and Recovery_Time_Min is used as-is.
+    
+    Returns:
+        DataFrame with FEATURE_COLUMNS + Recovery_Time_Min; sessions without HRV,
+        GSR or a positive recovery time are dropped.
+    """
+    df = sessions if isinstance(sessions, pd.DataFrame) else pd.DataFrame(list(sessions))
+    if set(FEATURE_COLUMNS + [LABEL_COLUMN]).issubset(df.columns):
+        episodes = df[FEATURE_COLUMNS + [LABEL_COLUMN]].astype(float)
+    else:
+        episodes = pd.DataFrame(index=df.index)
+        for column, field in SESSION_FIELDS.items():
+            if field in df.columns:
+                episodes[column] = pd.to_numeric(df[field], errors='coerce')
+            else:
+                episodes[column] = np.nan
+        if 'gsr' in df.columns:
+            # Sessions without an explicit peak fall back to their GSR level
+            episodes['Stress_Peak_GSR'] = episodes['Stress_Peak_GSR'].fillna(pd.to_numeric(df['gsr'], errors='coerce'))
+        episodes = episodes.fillna(EPISODE_DEFAULTS)
+        # Session recovery_time is stored in seconds
+        recovery = df['recovery_time'] if 'recovery_time' in df.columns else np.nan
+        episodes[LABEL_COLUMN] = pd.to_numeric(recovery, errors='coerce') / 60.0
+    
+    episodes = episodes.dropna()
+    return episodes[episodes[LABEL_COLUMN] > 0].reset_index(drop=True)
+
+def _iter_episode_chunks(source, chunk_rows):
+    """Yields episode DataFrames of at most chunk_rows from a CSV path, DataFrame or session list."""
+    if isinstance(source, str):
+        for chunk in pd.read_csv(source, chunksize=chunk_rows):
+            yield extract_recovery_episodes(chunk)
+    elif isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            yield extract_recovery_episodes(source.iloc[start:start + chunk_rows])
+    else:
+        iterator = iter(source)
+        while True:
+            batch = list(itertools.islice(iterator, chunk_rows))
+            if not batch:
+                break
+            yield extract_recovery_episodes(batch)
+
+def sample_recovery_episodes(source, max_rows=MAX_TRAINING_ROWS, chunk_rows=100_000, seed=42):
+    """
+    Streams episodes and keeps a uniform random sample of at most max_rows.
+    Memory stays bounded by max_rows + chunk_rows however long the history is
+    (bottom-k sampling: every row gets a random key, the smallest keys are kept).
+    
+    Returns:
+        Tuple of (X, y) NumPy arrays and the total number of episodes seen
+    """
+    rng = np.random.default_rng(seed)
+    kept = np.empty((0, len(FEATURE_COLUMNS) + 1))
+    keys = np.empty(0)
+    total = 0
+    for chunk in _iter_episode_chunks(source, chunk_rows):
+        rows = chunk[FEATURE_COLUMNS + [LABEL_COLUMN]].to_numpy(dtype=np.float64)
+        total += len(rows)
+        kept = np.concatenate([kept, rows])
+        keys = np.concatenate([keys, rng.random(len(rows))])
+        if len(kept) > max_rows:
+            keep = np.argpartition(keys, max_rows)[:max_rows]
+            kept, keys = kept[keep], keys[keep]
+    return kept[:, :-1], kept[:, -1], total
+
+def _forest_params(n_rows, n_jobs):
+    # Coarser leaves on large samples bound the node count of every tree
+    return {
+        'random_state': 42,
+        'n_jobs': n_jobs,
+        'min_samples_leaf': max(1, n_rows // MAX_LEAVES_PER_TREE),
+    }
+
+def retrain_recovery_model(source, n_jobs=-1, n_estimators=100, max_rows=MAX_TRAINING_ROWS, chunk_rows=100_000):
+    """
+    Full retrain of the recovery model from recorded recovery episodes.
+    
+    Args:
+        source: Session list, DataFrame or CSV path (read in chunks)
+        n_jobs: Parallel tree fitting (-1 = all cores)
+        max_rows: Uniform sample cap; bounds fit time and memory
+    
+    Returns:
+        The fitted model, already published to the registry
+    """
+    X, y, total = sample_recovery_episodes(source, max_rows=max_rows, chunk_rows=chunk_rows)
+    if len(X) == 0:
+        raise ValueError("No labelled recovery episodes found in source")
+    
+    model = RandomForestRegressor(n_estimators=n_estimators, **_forest_params(len(X), n_jobs))
+    model.fit(pd.DataFrame(X, columns=FEATURE_COLUMNS), y)
+    MODEL_REGISTRY.publish(MODEL_NAME, model)
+    print(f"AI Model retrained on {len(X)} of {total} recovery episodes")
+    return model
+
+def update_recovery_model(new_sessions, trees_per_update=10, max_trees=200, n_jobs=-1):
+    """
+    Incremental update: warm-starts the current forest with trees fit on
+    new episodes only, then drops the oldest trees beyond max_trees so the
+    ensemble is a sliding window over recent history.
+    
+    Returns:
+        The updated model, already published to the registry
+    """
+    episodes = extract_recovery_episodes(new_sessions)
+    if episodes.empty:
+        return load_model()
+    if len(episodes) > MAX_TRAINING_ROWS:
+        episodes = episodes.sample(MAX_TRAINING_ROWS, random_state=42)
+    
+    # Work on a copy so readers of the cached model never see a partial update
+    model = copy.deepcopy(load_model())
+    model.set_params(warm_start=True, n_jobs=n_jobs,
+                     min_samples_leaf=_forest_params(len(episodes), n_jobs)['min_samples_leaf'])
+    model.set_params(n_estimators=len(model.estimators_) + trees_per_update)
+    model.fit(episodes[FEATURE_COLUMNS], episodes[LABEL_COLUMN])
+    
+    if len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.set_params(n_estimators=max_trees)
+    MODEL_REGISTRY.publish(MODEL_NAME, model)
+    return model
+
 def load_model():
-    if os.path.exists(MODEL_PATH):
-        with open(MODEL_PATH, 'rb') as f:
-            return pickle.load(f)
+    """Return the process-wide cached model, blocking if it must be trained first."""
+    return MODEL_REGISTRY.get(MODEL_NAME, wait=True)
+
+def _as_feature_matrix(features=None, hrv=None, gsr_peak=None, sleep=None, caffeine=None):
+    """Stack a DataFrame, (n, 4) array or per-feature arrays into one (n, 4) matrix."""
+    if features is None:
+        columns = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (hrv, gsr_peak, sleep, caffeine)))
+        return np.column_stack([c.ravel() for c in columns])
+    if isinstance(features, pd.DataFrame):
+        return features[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    matrix = np.asarray(features, dtype=np.float64)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.shape[1] != len(FEATURE_COLUMNS):
+        raise ValueError(f"Expected {len(FEATURE_COLUMNS)} feature columns {FEATURE_COLUMNS}, got {matrix.shape[1]}")
+    return matrix
+
+_compact_cache = {}
+
+def get_compact_model():
+    """
+    Flat-array copy of the cached forest for fast trusted inference.
+    Memory-mapped from COMPACT_MODEL_DIR when already exported for the
+    current pickle hash; otherwise exported, verified against the sklearn
+    model and saved. Returns None while the model is being trained.
+    """
+    model = MODEL_REGISTRY.get(MODEL_NAME)
+    if model is None:
+        return None
+    sha256 = MODEL_REGISTRY.stats(MODEL_NAME)['sha256']
+    if sha256 is None:
+        return None
+    compact = _compact_cache.get(sha256)
+    if compact is not None:
+        return compact
+
+    directory = os.path.join(COMPACT_MODEL_DIR, sha256[:16])
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        compact = CompactForest.load(directory, mmap=True)
+    else:
+        compact = CompactForest.from_sklearn(model, source_sha256=sha256)
+        # Probe with the training feature ranges plus values outside them
+        probe = np.random.default_rng(0).uniform([0, 0, 0, 0], [120, 30, 14, 8], (2000, 4))
+        compact.verify_against(model, probe)
+        compact.save(directory)
+    _compact_cache.clear()
+    _compact_cache[sha256] = compact
+    return compact
+
+def predict_recovery_batch(features=None, hrv=None, gsr_peak=None, sleep=None, caffeine=None, trusted=False):
+    """
+    Vectorized recovery-time prediction for many rows at once.
+    
+    Args:
+        features: DataFrame with FEATURE_COLUMNS, or an (n, 4) array in that order.
+            Alternatively pass hrv/gsr_peak/sleep/caffeine as broadcastable arrays.
+        trusted: Skip sklearn input validation and predict with the compact
+            array-backed forest (finite, correctly ordered arrays only)
+    
+    Returns:
+        np.ndarray of recovery times in minutes, one per row
+    """
+    X = _as_feature_matrix(features, hrv, gsr_peak, sleep, caffeine)
+    model = MODEL_REGISTRY.get(MODEL_NAME)
+    # The compact copy can vanish under a concurrent invalidate/retrain;
+    # fall back to the sklearn model, then to the formula
+    compact = get_compact_model() if trusted and model is not None else None
+    start = time.perf_counter()
+    if compact is not None:
+        predictions = compact.predict(X)
+    elif model is not None:
+        predictions = model.predict(pd.DataFrame(X, columns=FEATURE_COLUMNS))
     else:
-        return train_recovery_model()
+        predictions = np.clip(recovery_time_formula(X[:, 0], X[:, 1], X[:, 2], X[:, 3]), 1, 30)
+    MODEL_REGISTRY.record_inference(MODEL_NAME, time.perf_counter() - start)
+    return predictions
 
 def predict_recovery(hrv, gsr_peak, sleep, caffeine):
-    model = load_model()
-    input_data = pd.DataFrame([[hrv, gsr_peak, sleep, caffeine]], 
-                              columns=['Baseline_HRV', 'Stress_Peak_GSR', 'Sleep_Hours', 'Caffeine_Intake'])
-    prediction = model.predict(input_data)[0]
-    return round(prediction, 1)
+    """
+    Predicts recovery time (minutes) for one set of inputs from the cached model.
+    Falls back to the physiology formula while the model is retrained
+    in the background, so the request path never trains inline.
+    """
+    X = np.array([[hrv, gsr_peak, sleep, caffeine]], dtype=np.float64)
+    if not np.isfinite(X).all():
+        raise ValueError("predict_recovery inputs must be finite numbers")
+    prediction = predict_recovery_batch(X, trusted=True)[0]
+    return round(float(prediction), 1)
+
+def get_model_stats():
+    """Load, training and inference timings for the recovery model."""
+    return MODEL_REGISTRY.stats(MODEL_NAME)
 
 # --- 3. Digital Twin Logic ---
 
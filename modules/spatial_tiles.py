@@ -0,0 +1,130 @@
+"""
+Community Resilience Mapping - Spatial Tile Index
+Quadtree (web-mercator z/x/y) tiles with pre-aggregated resilience
+statistics at every zoom level, so a map view reads only the tiles
+inside its viewport instead of scanning every location.
+"""
+import numpy as np
+from typing import Dict, Iterable, Optional, Tuple
+
+MIN_ZOOM = 4
+MAX_ZOOM = 16
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def lonlat_to_tile(lat, lon, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Web-mercator tile x, y containing each point at a zoom level."""
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    lon = np.asarray(lon, dtype=np.float64)
+    n = 1 << zoom
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def tile_center(x, y, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitude and longitude of tile centers."""
+    n = float(1 << zoom)
+    lon = (np.asarray(x) + 0.5) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (np.asarray(y) + 0.5) / n))))
+    return lat, lon
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the low 16 bits of v."""
+    v = v.astype(np.int64) & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    return (v | (v << 1)) & 0x55555555
+
+
+def morton_key(x, y) -> np.ndarray:
+    """Quadkey-ordered (Z-order) key; a parent tile's key is the child's >> 2."""
+    return _spread_bits(np.asarray(x)) << 1 | _spread_bits(np.asarray(y))
+
+
+class TileIndex:
+    """
+    Multi-zoom tile pyramid of additive statistics.
+
+    Points are sorted once by their Z-order key at MAX_ZOOM. Every coarser
+    tile is a contiguous run of that order, so each zoom level is built
+    with one reduceat pass and stored as sorted tile keys for
+    binary-search lookups.
+    """
+
+    def __init__(self, lat, lon, stats: Dict[str, np.ndarray],
+                 zooms: Iterable[int] = range(MIN_ZOOM, MAX_ZOOM + 1),
+                 sketches: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Args:
+            lat, lon: Point coordinates (degrees)
+            stats: Additive per-point values (counts, sums) to aggregate
+            zooms: Zoom levels to materialize (each <= MAX_ZOOM)
+            sketches: Per-point (n, registers) HyperLogLog arrays, merged
+                with an elementwise max so shared members count once
+        """
+        x, y = lonlat_to_tile(lat, lon, MAX_ZOOM)
+        keys = morton_key(x, y)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        sorted_stats = {name: np.asarray(values, dtype=np.float64)[order] for name, values in stats.items()}
+        sorted_sketches = {name: np.asarray(values)[order] for name, values in (sketches or {}).items()}
+
+        self.levels: Dict[int, Dict[str, np.ndarray]] = {}
+        for zoom in zooms:
+            tile_keys = keys >> (2 * (MAX_ZOOM - zoom))
+            if len(tile_keys):
+                starts = np.flatnonzero(np.concatenate([[True], tile_keys[1:] != tile_keys[:-1]]))
+            else:
+                starts = np.empty(0, dtype=np.int64)
+            level = {'key': tile_keys[starts], 'points': np.diff(np.append(starts, len(keys)))}
+            for name, values in sorted_stats.items():
+                level[name] = np.add.reduceat(values, starts) if len(starts) else np.empty(0)
+            for name, values in sorted_sketches.items():
+                level[name] = (np.maximum.reduceat(values, starts, axis=0) if len(starts)
+                               else values[:0])
+            self.levels[zoom] = level
+
+    def query(self, zoom: int, south: float, west: float, north: float, east: float) -> Dict[str, np.ndarray]:
+        """
+        Tiles of a zoom level intersecting a lat/lon bounding box.
+
+        Visible tile keys are enumerated from the viewport and looked up
+        with searchsorted, so cost depends on the viewport, not the
+        number of indexed points.
+
+        Returns:
+            Dict with 'x', 'y', 'lat', 'lon' (tile centers), 'points' and
+            every aggregated statistic and sketch, for non-empty visible tiles
+        """
+        level = self.levels[zoom]
+        x0, y0 = lonlat_to_tile(north, west, zoom)
+        x1, y1 = lonlat_to_tile(south, east, zoom)
+        xs = np.arange(int(x0), int(x1) + 1)
+        ys = np.arange(int(y0), int(y1) + 1)
+
+        if len(xs) * len(ys) <= len(level['key']):
+            wanted = morton_key(*np.meshgrid(xs, ys, indexing='ij')).ravel()
+            pos = np.clip(np.searchsorted(level['key'], wanted), 0, max(len(level['key']) - 1, 0))
+            hit = pos[level['key'][pos] == wanted] if len(level['key']) else pos[:0]
+        else:
+            # Viewport larger than the populated tile set: filter instead
+            tx, ty = self.tile_xy(zoom)
+            hit = np.flatnonzero((tx >= xs[0]) & (tx <= xs[-1]) & (ty >= ys[0]) & (ty <= ys[-1]))
+
+        result = {name: values[hit] for name, values in level.items()}
+        result['x'], result['y'] = self.tile_xy(zoom, result['key'])
+        result['lat'], result['lon'] = tile_center(result['x'], result['y'], zoom)
+        return result
+
+    def tile_xy(self, zoom: int, keys=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Tile x, y for Z-order keys (all tiles of the level by default)."""
+        keys = self.levels[zoom]['key'] if keys is None else np.asarray(keys, dtype=np.int64)
+        x = np.zeros(len(keys), dtype=np.int64)
+        y = np.zeros(len(keys), dtype=np.int64)
+        for bit in range(MAX_ZOOM):
+            x |= ((keys >> (2 * bit + 1)) & 1) << bit
+            y |= ((keys >> (2 * bit)) & 1) << bit
+        return x, y
@@ -0,0 +1,91 @@
+"""
+Canonical Symbiome Resilience Index (SRI) engine.
+One implementation for every SRI in the app, accepting scalars or
+arrays so whole sessions or cohorts are scored in a single NumPy pass.
+"""
+import numpy as np
+from typing import Dict, Optional
+
+# Weight profiles previously hardcoded in separate modules:
+# - 'science': science_logic.calculate_sri (raw weighted average)
+# - 'dashboard': utils.DataModels.calculate_sri (GSR inverted, clipped 0-100)
+WEIGHT_PROFILES = {
+    'science': {'hrv': 0.5, 'gsr': 0.3, 'facial': 0.2, 'invert_gsr': False, 'clip': False},
+    'dashboard': {'hrv': 0.35, 'gsr': 0.30, 'facial': 0.35, 'invert_gsr': True, 'clip': True},
+}
+
+# Stress Simulation Sandbox: baseline SRI and rule-based context adjustments
+CONTEXT_BASELINE_SRI = 72
+
+
+def register_profile(name: str, hrv: float, gsr: float, facial: float,
+                     invert_gsr: bool = False, clip: bool = False):
+    """Add or replace a named weight profile."""
+    WEIGHT_PROFILES[name] = {
+        'hrv': hrv, 'gsr': gsr, 'facial': facial,
+        'invert_gsr': invert_gsr, 'clip': clip
+    }
+
+
+def calculate_sri(hrv, gsr, facial=75.0, profile: str = 'science', weights: Optional[Dict] = None):
+    """
+    Calculates SRI from HRV, GSR and facial calmness.
+
+    Args:
+        hrv, gsr, facial: Scalars or broadcastable arrays (0-100 scale)
+        profile: Name in WEIGHT_PROFILES
+        weights: Explicit profile dict overriding `profile`
+
+    Returns:
+        Same shape as the broadcast inputs (a float for scalar inputs)
+    """
+    w = weights or WEIGHT_PROFILES[profile]
+    hrv = np.asarray(hrv, dtype=np.float64)
+    gsr = np.asarray(gsr, dtype=np.float64)
+    facial = np.asarray(facial, dtype=np.float64)
+
+    if w.get('invert_gsr'):
+        gsr = np.maximum(0, 100 - gsr)  # Lower GSR is better
+    sri = hrv * w['hrv'] + gsr * w['gsr'] + facial * w['facial']
+    if w.get('clip'):
+        sri = np.clip(sri, 0, 100)
+    return sri if sri.ndim else sri.item()
+
+
+def calculate_session_sri(df, hrv_col: str = 'HRV_Score', gsr_col: str = 'GSR_Score',
+                          facial_col: str = 'Facial_Calm', profile: str = 'science') -> np.ndarray:
+    """SRI for every row of a session or cohort DataFrame."""
+    return calculate_sri(
+        df[hrv_col].to_numpy(), df[gsr_col].to_numpy(), df[facial_col].to_numpy(), profile=profile
+    )
+
+
+def context_sri_adjustments(light, noise, temp, sleep, caffeine, screen) -> Dict[str, np.ndarray]:
+    """
+    Rule-based SRI adjustments from environment and lifestyle parameters.
+
+    Returns:
+        Ordered dict of factor label -> adjustment array (0 where the rule
+        does not fire), broadcast over all inputs.
+    """
+    light, noise, temp, sleep, caffeine, screen = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (light, noise, temp, sleep, caffeine, screen))
+    )
+    return {
+        'Optimal light': np.where((light >= 60) & (light <= 80), 5, 0),
+        'Low light': np.where(light < 40, -3, 0),
+        'High noise': np.where(noise > 60, -5, 0),
+        'Suboptimal temp': np.where((temp < 20) | (temp > 24), -2, 0),
+        'Optimal sleep': np.where((sleep >= 7) & (sleep <= 9), 5, 0),
+        'Sleep deprivation': np.where(sleep < 6, -8, 0),
+        'Oversleep': np.where(sleep > 10, -3, 0),
+        'High caffeine': np.where(caffeine > 3, -4, 0),
+        'Excessive screen time': np.where(screen >= 6, -5, 0),
+    }
+
+
+def calculate_context_sri(light, noise, temp, sleep, caffeine, screen):
+    """Predicted SRI for one or many sandbox parameter combinations."""
+    adjustments = context_sri_adjustments(light, noise, temp, sleep, caffeine, screen)
+    sri = CONTEXT_BASELINE_SRI + sum(adjustments.values())
+    return sri if sri.ndim else sri.item()
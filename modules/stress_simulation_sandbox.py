@@ -6,6 +6,8 @@ import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
 
+from .sri_engine import CONTEXT_BASELINE_SRI, context_sri_adjustments
+
 def render_stress_simulation_sandbox_page():
     # Header
     st.markdown('<div style="text-align: center; margin-bottom: 30px;"><h2 style="color: #06b6d4; font-size: 2.5rem; margin-bottom: 10px;">Stress Simulation Sandbox</h2><p style="color: #94a3b8; font-size: 0.95rem;">Experimental "What-If" environment simulator - Adjust parameters and see predicted resilience impact</p></div>', unsafe_allow_html=True)
@@ -189,60 +191,12 @@ def apply_scenario(scenario):
 
 def calculate_predicted_sri(params):
     """Calculate predicted SRI based on parameters"""
-    base_sri = 72
-    factors = {}
-    
-    # Light factor
-    if 60 <= params['light'] <= 80:
-        base_sri += 5
-        factors['Optimal light'] = 5
-    elif params['light'] < 40:
-        base_sri -= 3
-        factors['Low light'] = -3
-    
-    # Noise factor
-    if params['noise'] < 40:
-        # Quiet is good
-        pass
-    elif params['noise'] > 60:
-        base_sri -= 5
-        factors['High noise'] = -5
-    
-    # Temperature factor
-    if 20 <= params['temp'] <= 24:
-        # Optimal temp
-        pass
-    else:
-        base_sri -= 2
-        factors['Suboptimal temp'] = -2
-    
-    # Sleep factor (most important)
-    if 7 <= params['sleep'] <= 9:
-        base_sri += 5
-        factors['Optimal sleep'] = 5
-    elif params['sleep'] < 6:
-        base_sri -= 8
-        factors['Sleep deprivation'] = -8
-    elif params['sleep'] > 10:
-        base_sri -= 3
-        factors['Oversleep'] = -3
-    
-    # Caffeine factor
-    if 1 <= params['caffeine'] <= 2:
-        # Moderate caffeine is fine
-        pass
-    elif params['caffeine'] > 3:
-        base_sri -= 4
-        factors['High caffeine'] = -4
-    
-    # Screen time factor
-    if params['screen'] < 6:
-        # Acceptable screen time
-        pass
-    else:
-        base_sri -= 5
-        factors['Excessive screen time'] = -5
-    
+    adjustments = context_sri_adjustments(
+        params['light'], params['noise'], params['temp'],
+        params['sleep'], params['caffeine'], params['screen']
+    )
+    factors = {label: int(value) for label, value in adjustments.items() if value != 0}
+    base_sri = CONTEXT_BASELINE_SRI + sum(factors.values())
     return base_sri, factors
 
 
@@ -0,0 +1,172 @@
+"""
+Compact array-backed tree ensemble.
+Flattens a fitted sklearn forest regressor into plain NumPy arrays
+(feature, threshold, children, value) so single-row inference avoids
+sklearn's per-call overhead and the model file can be memory-mapped
+and shared read-only across worker processes.
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+# sklearn marks leaves with feature == -2 (TREE_UNDEFINED)
+_SKLEARN_LEAF = -2
+
+_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+
+
+class CompactForest:
+    """
+    Averaging tree ensemble stored as flat arrays.
+
+    Nodes of all trees are concatenated. Leaves point to themselves in
+    `children`, so a fixed number of traversal steps (max_depth) brings
+    every (row, tree) cursor to its leaf without per-tree branching.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth: int, n_features: int,
+                 source_sha256: Optional[str] = None):
+        self.feature = feature          # (n_nodes,) int32, 0 for leaves
+        self.threshold = threshold      # (n_nodes,) float64
+        self.children = children        # (n_nodes, 2) int32: [left, right]
+        self.value = value              # (n_nodes,) float64 leaf outputs
+        self.roots = roots              # (n_trees,) int32
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.source_sha256 = source_sha256
+        self._flat_children = children.reshape(-1)
+
+    @classmethod
+    def from_sklearn(cls, model, source_sha256: Optional[str] = None) -> "CompactForest":
+        """
+        Export a fitted RandomForestRegressor / ExtraTreesRegressor.
+
+        Args:
+            model: Fitted single-output sklearn forest regressor
+            source_sha256: Hash of the pickle the forest was loaded from
+
+        Returns:
+            CompactForest with identical predictions
+        """
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.feature == _SKLEARN_LEAF
+            own = np.arange(offset, offset + n)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            left = np.where(is_leaf, own, tree.children_left + offset)
+            right = np.where(is_leaf, own, tree.children_right + offset)
+            children.append(np.column_stack([left, right]))
+            values.append(tree.value.reshape(n, -1)[:, 0])
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=int(max_depth),
+            n_features=int(model.n_features_in_),
+            source_sha256=source_sha256,
+        )
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict for an (n, n_features) matrix (or a single 1-D row).
+
+        Inputs are cast to float32 before comparison, as sklearn does,
+        so results match the source forest exactly.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows = len(X)
+        flat_X = X.reshape(-1)
+        row_offset = (np.arange(n_rows, dtype=np.int64) * self.n_features)[:, None]
+
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).astype(np.int64)
+        for _ in range(self.max_depth):
+            x = flat_X[row_offset + self.feature[node]]
+            go_right = x > self.threshold[node]
+            node = self._flat_children[2 * node + go_right]
+
+        # Sequential sum over trees (axis 0) matches sklearn's accumulation order
+        leaf_values = self.value[node.T]
+        return np.add.reduce(leaf_values, axis=0) / len(self.roots)
+
+    def verify_against(self, model, X) -> float:
+        """
+        Check that predictions equal the sklearn forest's bit for bit.
+
+        Raises:
+            ValueError: If any prediction differs
+
+        Returns:
+            Maximum absolute difference (0.0 on success)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        expected = np.zeros(len(X))
+        for estimator in model.estimators_:
+            expected += estimator.tree_.predict(X).reshape(len(X), -1)[:, 0]
+        expected /= len(model.estimators_)
+        max_diff = float(np.max(np.abs(self.predict(X) - expected))) if len(X) else 0.0
+        if max_diff != 0.0:
+            raise ValueError(f"Compact forest diverges from source model (max abs diff {max_diff})")
+        return max_diff
+
+    def save(self, directory: str):
+        """
+        Write one .npy per array plus meta.json; loadable with mmap.
+        Files are staged in a temporary directory and renamed into
+        place, so an existing (possibly mapped) export is never rewritten.
+        """
+        if os.path.exists(directory):
+            return
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix=".tmp_forest_")
+        # mkdtemp creates a 0700 directory; worker processes of other users map these files
+        os.chmod(staging, 0o755)
+        for name in _ARRAYS:
+            np.save(os.path.join(staging, f"{name}.npy"), getattr(self, name))
+        meta = {
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "source_sha256": self.source_sha256,
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Another process exported the same model first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "CompactForest":
+        """
+        Load a saved forest. With mmap=True the arrays are read-only
+        memory maps, so processes share one copy through the page cache.
+        """
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        # Plain ndarray views over the maps avoid np.memmap's per-op wrapping cost
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode).view(np.ndarray)
+            for name in _ARRAYS
+        }
+        return cls(**arrays, **meta)
@@ -1,4 +1,7 @@
 import random
+from collections import deque
+from functools import lru_cache
+
 import numpy as np
 
 class TwinModel:
@@ -12,6 +15,7 @@ class TwinModel:
         self.identity = self._infer_identity()
         self.baseline_stability = random.uniform(85, 98) # High stability by default
         self.confidence_score = random.randint(82, 94)
+        self.rq_state = RollingRQState()
         
     def _infer_identity(self):
         """
@@ -31,29 +35,18 @@ class TwinModel:
         """
         Calculates the Resilience Quotient (0-100).
         RQ = Resistance + Recovery Stability - Drift
+        
+        Deterministic: the same history always yields the same RQ. For live
+        readings use update_rq(), which costs O(1) per sample.
         """
         if not hrv_history:
             return 85.0 # Default start
-            
-        # 1. Resistance: Ability to maintain HRV during stress (Variance proxy)
-        # Higher variability at rest is good, but stability under load is key.
-        # We simplify: High HRV avg = good resistance.
-        avg_hrv = np.mean(hrv_history[-20:]) if len(hrv_history) > 20 else 65
-        resistance = (avg_hrv / 100) * 40 # Max 40 pts
-        
-        # 2. Recovery Velocity: How fast it bounces back? 
-        # Simulated by looking at recent trend.
-        if len(hrv_history) > 5:
-            trend = hrv_history[-1] - hrv_history[-5]
-            rec_velocity = 30 + clip(trend, -10, 10) # 20-40 pts
-        else:
-            rec_velocity = 30
-            
-        # 3. Stability Drift: Long term degradation (simulated noise penalty)
-        drift_penalty = random.uniform(0, 10)
-        
-        rq = resistance + rec_velocity - drift_penalty
-        return max(0, min(100, rq))
+        return RollingRQState.from_history(hrv_history).score()
+
+    def update_rq(self, hrv):
+        """Feeds one live HRV reading into the twin's rolling state and returns RQ."""
+        self.rq_state.update(hrv)
+        return self.rq_state.score()
 
     def get_rq_breakdown(self, rq_score):
         """Decomposes RQ for the UI."""
@@ -73,42 +66,49 @@ class TwinModel:
         Generates a 48-hour forecast based on behavioural modifiers.
         modifiers: dict of {sleep: float, caffeine: float, etc}
         """
-        hours = list(range(48))
-        
-        # Base trajectory (circadian rhythm)
-        base_curve = [current_rq + (5 * np.sin(h/24 * 2 * np.pi)) for h in hours]
-        
-        # Apply Modifiers
-        # 1. Sleep: < 7 hours = accumulating drag
-        sleep_hours = modifiers.get('sleep', 7.0)
-        sleep_impact = 0
-        if sleep_hours < 7:
-            sleep_deficit = 7 - sleep_hours
-            # Decay accumulates over time
-            sleep_impact = [-(h * 0.5 * sleep_deficit) for h in hours]
-        else:
-            # Surplus boost
-            sleep_impact = [(h * 0.2) for h in hours]
-            
-        # 2. Caffeine: Spike then crash
-        caffeine_cups = modifiers.get('caffeine', 0)
-        caffeine_impact = [0] * 48
-        if caffeine_cups > 0:
-            # Spike at h=1, Crash at h=5
-            for h in range(48):
-                if h < 4: caffeine_impact[h] = caffeine_cups * 3
-                elif h < 8: caffeine_impact[h] = -(caffeine_cups * 4) # Crash hard
-                else: caffeine_impact[h] = -(caffeine_cups * 0.5) # Lingering adenosine
+        forecast = predict_future_batch(
+            current_rq,
+            sleep=modifiers.get('sleep', 7.0),
+            caffeine=modifiers.get('caffeine', 0)
+        )
+        return forecast[0].tolist()
+
+    def predict_future_cached(self, current_rq, modifiers):
+        """
+        Memoized 48-hour forecast for one (rq, modifiers) combination.
+        Life noise is seeded from the key, so repeated slider positions
+        return the identical (read-only) trajectory from cache.
+        """
+        return _cached_forecast(
+            round(float(current_rq), 2),
+            round(float(modifiers.get('sleep', 7.0)), 2),
+            round(float(modifiers.get('caffeine', 0)), 2)
+        )
+
+    def predict_future_grid(self, current_rq, sleep_values, caffeine_values, screen_values=(2,)):
+        """
+        Forecasts every sleep × caffeine × screen combination in one call.
         
-        # Combine
-        forecast = []
-        for i in range(48):
-            val = base_curve[i] + sleep_impact[i] + caffeine_impact[i]
-            # Add random "life noise"
-            val += random.uniform(-2, 2)
-            forecast.append(max(10, min(95, val)))
-            
-        return forecast
+        Returns:
+            dict with flattened 'sleep', 'caffeine', 'screen' scenario columns
+            and 'forecast' of shape (scenarios, 48). Memoized per grid.
+        """
+        return _cached_grid(
+            round(float(current_rq), 2),
+            tuple(float(v) for v in sleep_values),
+            tuple(float(v) for v in caffeine_values),
+            tuple(float(v) for v in screen_values)
+        )
+
+    def simulate_future_bands(self, current_rq, modifiers, n_samples=10000, seed=0):
+        """
+        Monte Carlo percentile bands (5/25/50/75/95) for the 48-hour forecast.
+        See iter_future_bands() for the streaming variant.
+        """
+        bands = None
+        for bands in iter_future_bands(current_rq, modifiers, n_samples=n_samples, seed=seed):
+            pass
+        return bands
 
     def get_shap_explanation(self, modifiers):
         """
@@ -177,5 +177,202 @@ class TwinModel:
                 "confidence": "High (95%)"
             }
 
+# Intervention readiness tiers (upper RQ bound, exclusive)
+READINESS_THRESHOLDS = (40, 70)
+READINESS_STATUSES = np.array(["Ready", "Optional", "Standby"])
+
+def intervention_readiness_batch(rq_scores):
+    """
+    Vectorized readiness status for many RQ scores.
+    Same tiers as TwinModel.get_intervention_readiness.
+    """
+    tier = np.searchsorted(READINESS_THRESHOLDS, np.asarray(rq_scores, dtype=np.float64), side='right')
+    return READINESS_STATUSES[tier]
+
+FORECAST_HOURS = 48
+_HOURS = np.arange(FORECAST_HOURS)
+# Caffeine: spike for 4h, hard crash until h=8, then lingering adenosine (per cup)
+_CAFFEINE_PROFILE = np.where(_HOURS < 4, 3.0, np.where(_HOURS < 8, -4.0, -0.5))
+_FORECAST_CACHE_SIZE = 4096
+
+def predict_future_batch(current_rq, sleep=7.0, caffeine=0, screen=None, rng=None):
+    """
+    Vectorized 48-hour forecast for many modifier scenarios.
+    
+    Args:
+        current_rq: Scalar or per-scenario RQ
+        sleep, caffeine: Scalars or arrays, broadcast to one value per scenario
+        screen: Accepted for slider grids; the trajectory model has no screen
+            term yet (it only feeds the SHAP explanation), so it only sets shape
+        rng: np.random.Generator for the life noise (default: fresh generator)
+    
+    Returns:
+        np.ndarray of shape (scenarios, 48)
+    """
+    rng = rng or np.random.default_rng()
+    rq, sleep, caffeine, _ = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in (current_rq, sleep, caffeine, 0 if screen is None else screen))
+    )
+    rq, sleep, caffeine = rq.ravel()[:, None], sleep.ravel()[:, None], caffeine.ravel()[:, None]
+    
+    # Base trajectory (circadian rhythm)
+    forecast = rq + 5 * np.sin(_HOURS / 24 * 2 * np.pi)
+    # Sleep: < 7 hours = accumulating drag, otherwise surplus boost
+    forecast = forecast + np.where(sleep < 7, -(_HOURS * 0.5 * (7 - sleep)), _HOURS * 0.2)
+    # Caffeine: spike then crash
+    forecast += np.where(caffeine > 0, caffeine * _CAFFEINE_PROFILE, 0.0)
+    # Random "life noise"
+    forecast += rng.uniform(-2, 2, forecast.shape)
+    return np.clip(forecast, 10, 95)
+
+def _seeded_rng(key):
+    # Numeric tuples hash deterministically, so cached noise is reproducible
+    return np.random.default_rng(hash(key) & 0xFFFFFFFF)
+
+@lru_cache(maxsize=_FORECAST_CACHE_SIZE)
+def _cached_forecast(rq, sleep, caffeine):
+    forecast = predict_future_batch(rq, sleep, caffeine, rng=_seeded_rng((rq, sleep, caffeine)))[0]
+    forecast.flags.writeable = False
+    return forecast
+
+@lru_cache(maxsize=64)
+def _cached_grid(rq, sleep_values, caffeine_values, screen_values):
+    sleep, caffeine, screen = (a.ravel() for a in np.meshgrid(sleep_values, caffeine_values, screen_values, indexing='ij'))
+    forecast = predict_future_batch(rq, sleep, caffeine, screen, rng=_seeded_rng((rq, sleep_values, caffeine_values, screen_values)))
+    for array in (sleep, caffeine, screen, forecast):
+        array.flags.writeable = False
+    return {'sleep': sleep, 'caffeine': caffeine, 'screen': screen, 'forecast': forecast}
+
+# Monte Carlo: uncertainty of the trajectory model's coefficients (mean, sd)
+MC_PERCENTILES = (5, 25, 50, 75, 95)
+MC_PARAM_UNCERTAINTY = {
+    'circadian_amplitude': (5.0, 1.0),
+    'sleep_deficit_rate': (0.5, 0.1),
+    'sleep_surplus_rate': (0.2, 0.05),
+    'caffeine_scale': (1.0, 0.2),
+}
+
+def _mc_rng(seed, batch_index):
+    # Counter-based Philox: batch b always reads the same independent block
+    return np.random.Generator(np.random.Philox(key=seed, counter=[0, 0, batch_index, 0]))
+
+def _simulate_trajectories(current_rq, sleep, caffeine, n, rng):
+    """(n, 48) trajectories with sampled coefficients plus hourly life noise."""
+    draws = {name: rng.normal(mean, sd, (n, 1)) for name, (mean, sd) in MC_PARAM_UNCERTAINTY.items()}
+    forecast = current_rq + draws['circadian_amplitude'] * np.sin(_HOURS / 24 * 2 * np.pi)
+    if sleep < 7:
+        forecast = forecast - _HOURS * draws['sleep_deficit_rate'] * (7 - sleep)
+    else:
+        forecast = forecast + _HOURS * draws['sleep_surplus_rate']
+    if caffeine > 0:
+        forecast = forecast + draws['caffeine_scale'] * caffeine * _CAFFEINE_PROFILE
+    forecast += rng.uniform(-2, 2, forecast.shape)
+    return np.clip(forecast, 10, 95)
+
+def iter_future_bands(current_rq, modifiers, n_samples=10000, batch_size=1000, seed=0):
+    """
+    Streams Monte Carlo percentile bands as samples accumulate.
+    
+    The first batch is ready within milliseconds, so the UI can draw a
+    band immediately and refine it as later batches arrive. Batch sizes
+    double, keeping the number of percentile refreshes logarithmic in
+    n_samples. Results are reproducible for a given (seed, batch_size).
+    
+    Yields:
+        dict with 'n_samples', 'done' and 'percentiles' {p: array(48)}
+    """
+    sleep = float(modifiers.get('sleep', 7.0))
+    caffeine = float(modifiers.get('caffeine', 0))
+    samples = np.empty((n_samples, FORECAST_HOURS))
+    filled = 0
+    batch_index = 0
+    while filled < n_samples:
+        n = min(batch_size, n_samples - filled)
+        samples[filled:filled + n] = _simulate_trajectories(
+            float(current_rq), sleep, caffeine, n, _mc_rng(seed, batch_index)
+        )
+        filled += n
+        batch_index += 1
+        batch_size *= 2
+        bands = np.percentile(samples[:filled], MC_PERCENTILES, axis=0)
+        yield {
+            'n_samples': filled,
+            'done': filled == n_samples,
+            'percentiles': dict(zip(MC_PERCENTILES, bands))
+        }
+
+@lru_cache(maxsize=8192)
+def score_rq(avg_hrv, trend, drift_penalty):
+    """
+    Pure RQ score from the rolling-state summary (safe to cache).
+    
+    1. Resistance: High HRV avg = good resistance (max 40 pts)
+    2. Recovery Velocity: recent HRV trend, 20-40 pts
+    3. Stability Drift: penalty for sustained decline below baseline (0-10)
+    """
+    resistance = (avg_hrv / 100) * 40
+    rec_velocity = 30 + clip(trend, -10, 10)
+    rq = resistance + rec_velocity - drift_penalty
+    return max(0, min(100, rq))
+
+class RollingRQState:
+    """
+    Rolling HRV statistics for RQ, updated in O(1) per sample.
+    
+    Keeps a running sum over the last RESISTANCE_WINDOW readings, the last
+    TREND_LAG readings for recovery velocity, and a slow EWMA baseline.
+    Drift is the shortfall of the recent mean below that baseline, so it
+    is a deterministic function of the stored history.
+    """
+    
+    RESISTANCE_WINDOW = 20
+    TREND_LAG = 5
+    DEFAULT_HRV = 65
+    BASELINE_ALPHA = 0.02       # Slow EWMA: ~50-sample memory
+    DRIFT_PER_HRV_POINT = 0.5   # Penalty points per HRV point below baseline
+    MAX_DRIFT_PENALTY = 10.0
+    
+    def __init__(self):
+        self.count = 0
+        self.window = deque(maxlen=self.RESISTANCE_WINDOW)
+        self.window_sum = 0.0
+        self.recent = deque(maxlen=self.TREND_LAG)
+        self.baseline = None
+    
+    @classmethod
+    def from_history(cls, hrv_history):
+        state = cls()
+        for hrv in hrv_history:
+            state.update(hrv)
+        return state
+    
+    def update(self, hrv):
+        hrv = float(hrv)
+        if len(self.window) == self.window.maxlen:
+            self.window_sum -= self.window[0]
+        self.window.append(hrv)
+        self.window_sum += hrv
+        self.recent.append(hrv)
+        if self.baseline is None:
+            self.baseline = hrv
+        else:
+            self.baseline += self.BASELINE_ALPHA * (hrv - self.baseline)
+        self.count += 1
+    
+    def summary(self):
+        """(avg_hrv, trend, drift_penalty), rounded so equal states share a cache key."""
+        if self.count > self.RESISTANCE_WINDOW:
+            avg_hrv = self.window_sum / len(self.window)
+        else:
+            avg_hrv = self.DEFAULT_HRV
+        trend = self.recent[-1] - self.recent[0] if self.count > self.TREND_LAG else 0.0
+        recent_mean = self.window_sum / len(self.window) if self.window else 0.0
+        shortfall = max(0.0, (self.baseline or 0.0) - recent_mean)
+        drift = min(self.MAX_DRIFT_PENALTY, shortfall * self.DRIFT_PER_HRV_POINT)
+        return round(avg_hrv, 4), round(trend, 4), round(drift, 4)
+    
+    def score(self):
+        return score_rq(*self.summary())
+
 def clip(val, min_val, max_val):
     return max(min_val, min(val, max_val))
@@ -8,6 +8,8 @@ from typing import Dict, List, Optional
 import hashlib
 import json
 
+from . import sri_engine
+
 class DataModels:
     """Shared data models and structures"""
     
@@ -33,54 +35,92 @@ class DataModels:
     
     @staticmethod
     def calculate_sri(hrv: float, gsr: float, facial_calm: float = 75.0) -> float:
-        """Calculate Stress Resilience Index"""
-        # Weighted formula: HRV (35%), GSR (30%), Facial (35%)
-        normalized_gsr = max(0, 100 - gsr)  # Invert GSR (lower is better)
-        sri = (hrv * 0.35) + (normalized_gsr * 0.30) + (facial_calm * 0.35)
-        return np.clip(sri, 0, 100)
+        """Calculate Stress Resilience Index (scalars or arrays)"""
+        # Weighted formula: HRV (35%), inverted GSR (30%), Facial (35%), clipped 0-100
+        return sri_engine.calculate_sri(hrv, gsr, facial_calm, profile='dashboard')
 
 class TimeSeriesGenerator:
     """Generate realistic time-series data"""
     
+    # GSR phasic decay: each spike falls off as exp(-i / tau) for i < width
+    GSR_DECAY_TAU = 5.0
+    GSR_MAX_SPIKE_WIDTH = 15
+    
     @staticmethod
     def generate_hrv_series(
         base_hrv: float = 65,
         length: int = 100,
-        noise_level: float = 5.0
+        noise_level: float = 5.0,
+        n_series: Optional[int] = None,
+        dtype=np.float64
     ) -> np.ndarray:
-        """Generate realistic HRV time series"""
+        """
+        Generate realistic HRV time series.
+        
+        Args:
+            n_series: Number of independent series. None returns a single
+                1-D series; an int returns an (n_series, length) array.
+            dtype: Output dtype (np.float32 halves memory for large batches)
+        """
+        shape = (length,) if n_series is None else (n_series, length)
         t = np.linspace(0, 10, length)
         # Circadian rhythm + random walk
         circadian = 10 * np.sin(2 * np.pi * t / 24)
-        noise = np.random.normal(0, noise_level, length)
-        trend = np.cumsum(np.random.normal(0, 0.5, length))
+        noise = np.random.normal(0, noise_level, shape)
+        trend = np.cumsum(np.random.normal(0, 0.5, shape), axis=-1)
         
-        hrv = base_hrv + circadian + noise + trend
-        return np.clip(hrv, 30, 100)
+        hrv = noise
+        hrv += trend
+        hrv += base_hrv + circadian
+        np.clip(hrv, 30, 100, out=hrv)
+        return hrv.astype(dtype, copy=False)
     
     @staticmethod
     def generate_gsr_series(
         base_gsr: float = 2.5,
         length: int = 100,
-        stress_events: int = 3
+        stress_events: int = 3,
+        n_series: Optional[int] = None,
+        dtype=np.float64
     ) -> np.ndarray:
-        """Generate realistic GSR time series with stress spikes"""
-        gsr = np.ones(length) * base_gsr
+        """
+        Generate realistic GSR time series with stress spikes.
+        
+        Spikes are scatter-added onto the baseline in one pass: every
+        (spike, lag) pair contributes magnitude * kernel[lag], where the
+        exponential decay kernel is precomputed once for all series.
+        
+        Args:
+            n_series: Number of independent series. None returns a single
+                1-D series; an int returns an (n_series, length) array.
+            dtype: Output dtype (np.float32 halves memory for large batches)
+        """
+        rows = 1 if n_series is None else n_series
         
-        # Add stress spikes
-        for _ in range(stress_events):
-            spike_pos = np.random.randint(10, length - 10)
-            spike_magnitude = np.random.uniform(1.5, 3.0)
-            spike_width = np.random.randint(5, 15)
-            
-            for i in range(spike_width):
-                if spike_pos + i < length:
-                    decay = np.exp(-i / 5)
-                    gsr[spike_pos + i] += spike_magnitude * decay
+        # Spike parameters for every series at once: (rows, stress_events)
+        spike_pos = np.random.randint(10, length - 10, (rows, stress_events))
+        spike_magnitude = np.random.uniform(1.5, 3.0, (rows, stress_events))
+        spike_width = np.random.randint(5, TimeSeriesGenerator.GSR_MAX_SPIKE_WIDTH, (rows, stress_events))
+        
+        # Precomputed decay kernel, truncated per spike by its width
+        lags = np.arange(TimeSeriesGenerator.GSR_MAX_SPIKE_WIDTH)
+        kernel = np.exp(-lags / TimeSeriesGenerator.GSR_DECAY_TAU)
+        
+        cols = spike_pos[..., None] + lags
+        valid = (lags < spike_width[..., None]) & (cols < length)
+        row_idx = np.broadcast_to(np.arange(rows)[:, None, None], cols.shape)
+        flat_idx = row_idx[valid] * length + cols[valid]
+        weights = (spike_magnitude[..., None] * kernel)[valid]
+        phasic = np.bincount(flat_idx, weights=weights, minlength=rows * length)
+        
+        gsr = phasic.reshape(rows, length)
+        gsr += base_gsr
         
         # Add noise
-        gsr += np.random.normal(0, 0.2, length)
-        return np.clip(gsr, 0.5, 8.0)
+        gsr += np.random.normal(0, 0.2, (rows, length))
+        np.clip(gsr, 0.5, 8.0, out=gsr)
+        gsr = gsr.astype(dtype, copy=False)
+        return gsr[0] if n_series is None else gsr
 
 class CloudStorage:
     """Cloud storage utilities (Firebase/Supabase)"""
@@ -120,10 +160,72 @@ def format_duration(seconds: int) -> str:
         minutes = (seconds % 3600) // 60
         return f"{hours}h {minutes}m"
 
-def calculate_percentile(value: float, distribution: List[float]) -> int:
-    """Calculate percentile rank of value in distribution"""
-    if not distribution:
+def calculate_percentile(value: float, distribution) -> int:
+    """
+    Calculate percentile rank of value in distribution.
+    
+    distribution may be a list/array (sorted on every call) or a prebuilt
+    PercentileIndex, which answers in O(log n).
+    """
+    if isinstance(distribution, PercentileIndex):
+        return int(distribution.percentile(value))
+    if distribution is None or len(distribution) == 0:
         return 50
-    sorted_dist = sorted(distribution)
-    rank = sum(1 for x in sorted_dist if x <= value)
-    return int((rank / len(sorted_dist)) * 100)
+    return int(PercentileIndex(distribution).percentile(value))
+
+class PercentileIndex:
+    """
+    Percentile ranks against a reference population.
+    
+    Built once (one sort), then answers vectorized queries with
+    np.searchsorted. New scores go to a small sorted side buffer that is
+    merged into the main array once it grows past `merge_ratio` of it, so
+    updates are amortized O(log n) and queries stay exact.
+    """
+    
+    def __init__(self, reference=None, merge_ratio: float = 0.05):
+        self.sorted = np.sort(np.asarray(reference if reference is not None else [], dtype=np.float64).ravel())
+        self.buffer = np.empty(0)
+        self.merge_ratio = merge_ratio
+    
+    def __len__(self):
+        return len(self.sorted) + len(self.buffer)
+    
+    def add(self, values):
+        """Incrementally add new scores to the reference population."""
+        values = np.sort(np.asarray(values, dtype=np.float64).ravel())
+        self.buffer = np.concatenate([self.buffer, values])
+        self.buffer.sort(kind='mergesort')
+        if len(self.buffer) > max(1024, self.merge_ratio * len(self.sorted)):
+            self._merge_buffer()
+    
+    def _merge_buffer(self):
+        merged = np.concatenate([self.sorted, self.buffer])
+        merged.sort(kind='mergesort')  # Two sorted runs: near-linear merge
+        self.sorted = merged
+        self.buffer = np.empty(0)
+    
+    def merge(self, other: "PercentileIndex") -> "PercentileIndex":
+        """Combine two indexes (e.g. built on separate shards)."""
+        combined = PercentileIndex(merge_ratio=self.merge_ratio)
+        combined.sorted = np.concatenate([self.sorted, self.buffer, other.sorted, other.buffer])
+        combined.sorted.sort(kind='mergesort')
+        return combined
+    
+    def rank(self, values) -> np.ndarray:
+        """Number of reference scores <= each value."""
+        values = np.asarray(values, dtype=np.float64)
+        return (np.searchsorted(self.sorted, values, side='right')
+                + np.searchsorted(self.buffer, values, side='right'))
+    
+    def percentile(self, values):
+        """
+        Percentile rank (0-100, truncated like calculate_percentile) for a
+        scalar or an array of any size; 50 for an empty population.
+        """
+        n = len(self)
+        if n == 0:
+            result = np.full(np.shape(values), 50)
+        else:
+            result = np.trunc(self.rank(values) / n * 100).astype(np.int64)
+        return result if np.ndim(result) else int(result)
@@ -0,0 +1,32 @@
+"""
+Regression tests for the physiological stress-response model.
+"""
+import numpy as np
+import pytest
+
+from modules.physiological_model import AdvancedPhysiologyModel
+
+
+@pytest.mark.parametrize("duration_min, times", [(0, None), (1, np.empty(0))])
+def test_stress_response_without_a_time_span_is_empty(duration_min, times):
+    result = AdvancedPhysiologyModel().simulate_stress_response(1, duration_min, times)
+
+    for name in ('time', 'hrv', 'cortisol'):
+        assert isinstance(result[name], np.ndarray)
+        assert len(result[name]) == 0
+
+
+def test_stress_response_at_a_single_query_time():
+    model = AdvancedPhysiologyModel()
+    result = model.simulate_stress_response(1, 30, times=np.array([20.0]))
+    dense = model.simulate_population(1, 30)(np.array([20.0]))
+
+    assert np.array_equal(result['time'], [20.0])
+    assert len(result['hrv']) == 1
+    assert np.allclose(result['cortisol'], dense['cortisol'][0])
+
+
+def test_stress_response_is_sampled_on_the_time_grid():
+    result = AdvancedPhysiologyModel().simulate_stress_response(1, 2)
+
+    assert len(result['time']) == len(result['hrv']) == len(result['cortisol']) == 120
@@ -0,0 +1,86 @@
+"""
+k-anonymity regression tests for the Community Resilience Mapping engine.
+"""
+import numpy as np
+import pytest
+
+from modules.resilience_mapping_engine import ResilienceMappingEngine
+from modules.resilience_rollup import HLL_REGISTERS
+
+# A Monday..Sunday span, so it is both a calendar week and the last 7 days
+WEEK_START = 20010  # 2024-10-14 (Monday)
+WEEK_DAYS = np.arange(WEEK_START, WEEK_START + 7)
+
+
+def _week_records(participants_per_location, seed):
+    """Participant-day records where every participant visits on several days of the week."""
+    rng = np.random.default_rng(seed)
+    columns = {name: [] for name in ('location', 'day', 'participant', 'rq', 'recovery_minutes',
+                                     'stress_events', 'unresolved_events')}
+    for location, n_participants in enumerate(participants_per_location):
+        ids = rng.choice(10 ** 12, size=n_participants, replace=False)
+        visits = rng.random((n_participants, len(WEEK_DAYS))) < 0.6
+        visits[:, rng.integers(0, len(WEEK_DAYS))] = True  # everyone shows up at least once
+        who, when = np.nonzero(visits)
+        n = len(who)
+        columns['location'].append(np.full(n, location))
+        columns['day'].append(WEEK_DAYS[when])
+        columns['participant'].append(ids[who])
+        columns['rq'].append(rng.uniform(35, 95, n))
+        columns['recovery_minutes'].append(rng.uniform(3, 10, n))
+        columns['stress_events'].append(rng.integers(0, 7, n))
+        columns['unresolved_events'].append(np.zeros(n, dtype=np.int64))
+    return {name: np.concatenate(parts) for name, parts in columns.items()}
+
+
+@pytest.mark.parametrize("min_n", [20, 50])
+def test_location_below_min_n_over_a_week_is_suppressed(min_n):
+    for seed in range(25):
+        records = _week_records([min_n - 1, 200, 200, 200, 200], seed)
+        engine = ResilienceMappingEngine(min_n=min_n, records=records)
+
+        assert engine.aggregate_all('week')['participant_lower_bound'][0, -1] < min_n
+        assert engine.suppression_masks('week')['location'][0, -1]
+        assert engine.aggregate_location_data('Science Wing', 'week') is None
+
+
+def test_location_well_above_min_n_is_published():
+    for seed in range(25):
+        records = _week_records([40, 200, 200, 200, 200], seed)
+        engine = ResilienceMappingEngine(min_n=20, records=records)
+
+        data = engine.aggregate_location_data('Science Wing', 'week')
+        assert data is not None
+        # The sketch estimate stays within three standard errors of the truth
+        assert abs(data['participant_count'] - 40) <= 3 * 1.04 / np.sqrt(HLL_REGISTERS) * 40
+        assert engine.aggregate_all('week')['participant_lower_bound'][0, -1] <= 40
+
+
+def test_policy_insights_omit_temporal_patterns_of_a_suppressed_campus():
+    records = _week_records([3, 0, 0, 0, 0], seed=0)
+    day = WEEK_DAYS[-1].astype('datetime64[D]')
+    timestamps = np.array([day + np.timedelta64(9, 'h'), day + np.timedelta64(15, 'h')] * 3)
+    engine = ResilienceMappingEngine(min_n=10, records=records, stress_events={
+        'location': np.zeros(6, dtype=np.int64),
+        'timestamp': timestamps.astype('datetime64[s]'),
+        'intensity': np.array([91.0, 21.0] * 3),
+    })
+
+    assert engine.suppression_masks('week')['campus'][0, -1]
+    assert engine.get_all_locations_data('week') == []
+    assert engine.generate_peak_stress_times('Science Wing', 'week') == {}
+    assert engine.generate_policy_insights([], 'week') == []
+
+
+def test_policy_insights_report_peaks_of_a_published_campus():
+    records = _week_records([40, 40, 40, 40, 40], seed=0)
+    day = WEEK_DAYS[-1].astype('datetime64[D]')
+    timestamps = np.array([day + np.timedelta64(9, 'h'), day + np.timedelta64(15, 'h')] * 3)
+    engine = ResilienceMappingEngine(min_n=10, records=records, stress_events={
+        'location': np.zeros(6, dtype=np.int64),
+        'timestamp': timestamps.astype('datetime64[s]'),
+        'intensity': np.array([91.0, 21.0] * 3),
+    })
+
+    insights = engine.generate_policy_insights(engine.get_all_locations_data('week'), 'week')
+    assert any(text.startswith("Peak stress times occur at 9-10 AM") for text in insights)
@@ -0,0 +1,43 @@
+"""
+Time-window bucketing tests for the resilience rollup cube.
+"""
+import numpy as np
+
+from modules.resilience_rollup import RollupCube, window_buckets
+
+MONDAY = 20017  # 2024-10-21
+
+
+def _cube(days, participants):
+    n = len(days)
+    cube = RollupCube(np.zeros(1, dtype=np.int64))
+    cube.add_records(np.zeros(n, dtype=np.int64), days, participants, np.full(n, 60.0),
+                     np.full(n, 5.0), np.ones(n, dtype=np.int64), np.zeros(n, dtype=np.int64))
+    return cube
+
+
+def test_windows_end_on_the_latest_day():
+    days = np.arange(MONDAY - 40, MONDAY + 1)
+    assert np.array_equal(np.flatnonzero(window_buckets(days, 'day', MONDAY) == 0), [40])
+    assert np.array_equal(days[window_buckets(days, 'week', MONDAY) == 0], np.arange(MONDAY - 6, MONDAY + 1))
+    assert np.array_equal(days[window_buckets(days, 'month', MONDAY) == 0], np.arange(MONDAY - 29, MONDAY + 1))
+
+
+def test_week_view_on_a_monday_covers_the_previous_six_days():
+    # One new participant per day for the two weeks ending on a Monday
+    days = np.arange(MONDAY - 13, MONDAY + 1)
+    cube = _cube(days, np.arange(len(days)))
+
+    assert cube.view('day')['participant_count'][0, -1] == 1
+    assert cube.view('week')['participant_count'][0, -1] == 7
+    assert cube.view('week')['record_count'][0, -1] == 7
+    assert cube.view('month')['participant_count'][0, -1] == 14
+
+
+def test_week_view_counts_repeat_visitors_once():
+    days = np.repeat(np.arange(MONDAY - 6, MONDAY + 1), 3)
+    cube = _cube(days, np.tile([1, 2, 3], 7))
+
+    view = cube.view('week')
+    assert view['participant_count'][0, -1] == 3
+    assert view['record_count'][0, -1] == 21
@@ -0,0 +1,27 @@
+"""
+Stress-event history tests for the RQ history store.
+"""
+from datetime import datetime, timedelta
+
+from modules.rq_calculator import RQCalculator
+from modules.rq_history import RQHistoryStore
+
+
+def test_stress_view_reads_recorded_events_in_range():
+    store = RQHistoryStore()
+    now = datetime.now()
+    store.record_stress_event('u', now - timedelta(days=20), 40.0, 12.0)
+    store.record_stress_event('u', now - timedelta(days=2), 80.0, 7.0)
+    store.record_stress_event('u', now - timedelta(days=1), 20.0, 3.0)
+
+    calc = RQCalculator(history_store=store)
+    week = calc.generate_stress_response_data(num_events=50, user_id='u', days=7)
+    assert [e['stress_intensity'] for e in week] == [80.0, 20.0]
+    assert [e['category'] for e in week] == ["Moderate (5-10min)", "Fast (< 5min)"]
+    assert len(calc.generate_stress_response_data(num_events=2, user_id='u')) == 2
+    assert len(store.stress_range('u', now - timedelta(days=21), now - timedelta(days=19))['key']) == 1
+
+
+def test_stress_view_falls_back_to_demo_events_without_history():
+    calc = RQCalculator(history_store=RQHistoryStore())
+    assert len(calc.generate_stress_response_data(num_events=5, user_id='u')) == 5
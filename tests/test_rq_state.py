@@ -0,0 +1,31 @@
+"""
+Incremental RQState tests.
+"""
+from modules.rq_calculator import RQState
+
+
+def test_load_window_counts_calendar_days_across_gaps():
+    state = RQState()
+    for day in range(10):
+        state.update_day(stress_events=1, day_index=day)
+    # Twenty skipped days: days 0-9 are still inside the 30-day window
+    state.update_day(stress_events=5, day_index=29)
+    assert state.domain_inputs()['event_count'] == 15
+
+    # Day 35 leaves days 0-5 behind
+    state.update_day(stress_events=2, day_index=35)
+    assert state.domain_inputs()['event_count'] == 4 + 5 + 2
+
+
+def test_load_window_merges_same_day_and_late_updates():
+    state = RQState()
+    state.update_day(stress_events=3, day_index=40)
+    state.update_day(stress_events=2, day_index=40)
+    state.update_day(stress_events=1, day_index=38)  # late, inside the window
+    state.update_day(stress_events=9, day_index=5)   # late, outside the window
+    assert state.domain_inputs()['event_count'] == 6
+
+    restored = RQState.from_dict(state.to_dict())
+    assert restored.domain_inputs()['event_count'] == 6
+    restored.update_day(stress_events=1, day_index=70)
+    assert restored.domain_inputs()['event_count'] == 1